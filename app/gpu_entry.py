@@ -10,8 +10,9 @@ Responsibilities:
 - In "skeleton" mode:
     * Only updates statuses and creates dummy PNGs.
 - In "real" mode (SD35_RUNTIME_MODE=real and RUN_REAL_SD35=1):
-    * Loads SD3.5 Large via SD35Runtime.
-    * Actually runs txt2img for text2img jobs.
+    * Loads SD3.5 Large via the cached SD35Runtime (runtime.pipeline_manager).
+    * Actually runs txt2img for text2img jobs, micro-batching concurrent
+      same-shape jobs (runtime.batcher).
     * Saves real output.png in the job folder.
 """
 
@@ -24,7 +25,8 @@ from typing import Any, Dict, Optional
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 
-from runtime.sd35_runtime import SD35Runtime
+from runtime.batcher import Text2ImgJobBatcher
+from runtime.pipeline_manager import get_runtime, unload_runtimes
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -61,7 +63,9 @@ app = FastAPI(
     version="0.1.0",
 )
 
-sd35_runtime: Optional[SD35Runtime] = None  # set on startup if needed
+# Set on startup when the real runtime loaded; text2img dispatches go
+# through it, and it leases the cached SD35Runtime per batch.
+text2img_batcher: Optional[Text2ImgJobBatcher] = None
 
 
 # ---------------------------------------------------------------------------
@@ -81,7 +85,7 @@ class GPUDispatchPayload(BaseModel):
 
 @app.on_event("startup")
 async def on_startup():
-    global sd35_runtime
+    global text2img_batcher
 
     runtime_mode = os.getenv("SD35_RUNTIME_MODE", "skeleton").lower()
     logger.info(
@@ -92,29 +96,30 @@ async def on_startup():
 
     if runtime_mode == "real" and ENABLE_REAL_SD35:
         logger.info("Initializing SD35Runtime in REAL mode (GPU).")
-        sd35_runtime = SD35Runtime(mode="real", device="cuda")
-        sd35_runtime.load()
+        sd35_runtime = get_runtime(device="cuda")
 
         if sd35_runtime.mode != "real":
             logger.warning(
                 "SD35Runtime failed to stay in real mode (likely missing model or imports). "
                 "Falling back to skeleton behavior."
             )
-            sd35_runtime = None
+            text2img_batcher = None
+        else:
+            text2img_batcher = Text2ImgJobBatcher(device="cuda")
     else:
         logger.info(
             "Running in SKELETON mode (no SD3.5 load). "
             "Set SD35_RUNTIME_MODE=real and RUN_REAL_SD35=1 on GPU to enable real generation."
         )
-        sd35_runtime = None
+        text2img_batcher = None
 
 
 @app.on_event("shutdown")
 async def on_shutdown():
-    global sd35_runtime
-    if sd35_runtime is not None:
-        sd35_runtime.unload()
-        sd35_runtime = None
+    global text2img_batcher
+    if text2img_batcher is not None:
+        text2img_batcher = None
+        unload_runtimes()
         logger.info("SD35Runtime unloaded on shutdown.")
 
 
@@ -179,7 +184,7 @@ async def root():
         "message": "GPU Runtime for RENDEREXPO AI STUDIO.",
         "mode": os.getenv("SD35_RUNTIME_MODE", "skeleton"),
         "run_real_sd35": ENABLE_REAL_SD35,
-        "real_runtime_loaded": sd35_runtime is not None,
+        "real_runtime_loaded": text2img_batcher is not None,
     }
 
 
@@ -198,8 +203,6 @@ async def gpu_dispatch(payload: GPUDispatchPayload):
         * skeleton behavior: update status to 'dispatched_skeleton'
           and create a dummy output.png
     """
-    global sd35_runtime
-
     job_folder = payload.job_folder
     _ensure_job_folder(job_folder)
 
@@ -214,10 +217,11 @@ async def gpu_dispatch(payload: GPUDispatchPayload):
     meta["dispatched_at"] = datetime.utcnow().isoformat()
 
     # REAL SD3.5 PATH
-    if sd35_runtime is not None and meta.get("type") == "text2img":
+    if text2img_batcher is not None and meta.get("type") == "text2img":
         try:
-            updated_meta = sd35_runtime.generate_text2img(job_folder, meta)
-            _write_meta(job_folder, updated_meta)
+            # The batcher re-reads meta.json, renders and saves the result.
+            _write_meta(job_folder, meta)
+            updated_meta = await text2img_batcher.submit(job_folder)
             return {
                 "status": "ok",
                 "message": "GPU dispatch completed in REAL SD3.5 mode.",
@@ -225,7 +229,7 @@ async def gpu_dispatch(payload: GPUDispatchPayload):
                 "meta": updated_meta,
             }
         except Exception as exc:  # noqa: BLE001
-            logger.exception("SD35Runtime.generate_text2img() failed: %s", exc)
+            logger.exception("Batched SD3.5 text2img render failed: %s", exc)
             # Fall through to skeleton behavior below.
 
     # SKELETON PATH
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from dataclasses import dataclass
 
@@ -51,6 +52,13 @@ class AppConfig:
     img2img_default_width: int = 1024
     img2img_default_height: int = 1024
 
+    # Generated image format: "png" (fast zlib level 1), "webp" or "jpeg".
+    # Set via RENDEREXPO_OUTPUT_FORMAT.
+    output_format: str = os.environ.get("RENDEREXPO_OUTPUT_FORMAT", "png").lower()
+    # zlib level for PNG outputs (0-9); PIL's default 6 costs seconds on
+    # large frames. Set via RENDEREXPO_PNG_COMPRESS_LEVEL.
+    png_compress_level: int = int(os.environ.get("RENDEREXPO_PNG_COMPRESS_LEVEL", "1"))
+
 
 # Global config instance used by pipelines
 app_config = AppConfig()
@@ -2,6 +2,7 @@ from pathlib import Path
 from datetime import datetime
 from typing import Union, Optional
 import shutil
+import zlib
 
 try:
     from logs.log_utils import get_logger  # type: ignore
@@ -13,7 +14,17 @@ except ImportError:
     def get_logger(name: str):
         return logging.getLogger(name)
 
-from config import OUTPUTS_DIR, UPLOADS_DIR, LOGS_DIR  # type: ignore
+from config import OUTPUTS_DIR, UPLOADS_DIR, LOGS_DIR, app_config  # type: ignore
+
+try:
+    import fpnge  # type: ignore
+except ImportError:  # pragma: no cover - SIMD PNG encoder is optional
+    fpnge = None  # type: ignore
+
+try:
+    import cv2  # type: ignore
+except ImportError:  # pragma: no cover - only needed for save_output_array
+    cv2 = None  # type: ignore
 
 logger = get_logger(__name__)
 
@@ -22,6 +33,24 @@ logger = get_logger(__name__)
 # Filename / path helpers
 # -------------------------------------------------------------------
 
+_FILENAME_TS_FMT = "%Y%m%dT%H%M%S%f"
+
+
+_READY_DIRS = set()
+
+
+def ensure_output_dir(path: Union[str, Path]) -> Path:
+    """
+    Create an output directory the first time it is asked for, then just
+    return it (no mkdir syscall per request).
+    """
+    p = Path(path)
+    if p not in _READY_DIRS:
+        p.mkdir(parents=True, exist_ok=True)
+        _READY_DIRS.add(p)
+    return p
+
+
 def generate_output_filename(prefix: str = "output", ext: str = "png") -> str:
     """
     Generate a unique filename using UTC timestamp and a prefix.
@@ -32,12 +61,82 @@ def generate_output_filename(prefix: str = "output", ext: str = "png") -> str:
     """
     # Normalize extension to not have a leading dot.
     ext = ext.lstrip(".")
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    ts = datetime.utcnow().strftime(_FILENAME_TS_FMT)
     filename = f"{prefix}_{ts}.{ext}"
     logger.info("Generated output filename: %s", filename)
     return filename
 
 
+# Output format -> (file extension, PIL format, save kwargs). Outputs are
+# fetched once and are short-lived, so every format favors encode speed
+# over file size.
+_OUTPUT_FORMATS = {
+    # compress_type is PIL's pass-through for the zlib strategy; Z_RLE skips
+    # the LZ77 match search, which buys little on photo-like frames.
+    "png": (
+        "png",
+        "PNG",
+        {
+            "optimize": False,
+            "compress_level": app_config.png_compress_level,
+            "compress_type": zlib.Z_RLE,
+        },
+    ),
+    "webp": ("webp", "WEBP", {"quality": 92, "method": 0}),
+    "jpeg": ("jpg", "JPEG", {"quality": 92, "optimize": False}),
+}
+
+if app_config.output_format not in _OUTPUT_FORMATS:
+    logger.warning(
+        "Unknown RENDEREXPO_OUTPUT_FORMAT=%r; using png.", app_config.output_format
+    )
+_OUTPUT_EXT, _OUTPUT_PIL_FORMAT, _OUTPUT_SAVE_KWARGS = _OUTPUT_FORMATS.get(
+    app_config.output_format, _OUTPUT_FORMATS["png"]
+)
+
+
+def output_image_ext() -> str:
+    """Extension (no dot) for generated images, per RENDEREXPO_OUTPUT_FORMAT."""
+    return _OUTPUT_EXT
+
+
+def save_output_image(pil_image, path: Union[str, Path]) -> None:
+    """
+    Encode a generated image in the configured output format.
+
+    PNGs go through fpnge (AVX2 filters + fast DEFLATE) when it is
+    installed, which keeps large upscaled outputs from stalling on zlib;
+    otherwise, or for modes fpnge rejects, PIL does the encode.
+    """
+    if fpnge is not None and _OUTPUT_PIL_FORMAT == "PNG":
+        try:
+            data = fpnge.fromPIL(pil_image)
+        except (TypeError, ValueError) as e:
+            logger.info("fpnge cannot encode %s image (%s); using PIL.", pil_image.mode, e)
+        else:
+            Path(path).write_bytes(data)
+            return
+
+    pil_image.save(str(path), _OUTPUT_PIL_FORMAT, **_OUTPUT_SAVE_KWARGS)
+
+
+def _cv2_write_params() -> list:
+    if _OUTPUT_PIL_FORMAT == "PNG":
+        return [cv2.IMWRITE_PNG_COMPRESSION, app_config.png_compress_level]
+    if _OUTPUT_PIL_FORMAT == "WEBP":
+        return [cv2.IMWRITE_WEBP_QUALITY, _OUTPUT_SAVE_KWARGS["quality"]]
+    return [cv2.IMWRITE_JPEG_QUALITY, _OUTPUT_SAVE_KWARGS["quality"]]
+
+
+def save_output_array(bgr, path: Union[str, Path]) -> None:
+    """
+    Encode a BGR uint8 array (OpenCV layout, e.g. Real-ESRGAN output) in the
+    configured output format via cv2.imwrite, with no PIL round-trip.
+    """
+    if not cv2.imwrite(str(path), bgr, _cv2_write_params()):
+        raise OSError(f"cv2.imwrite failed for {path}")
+
+
 def validate_image_file(path: Union[str, Path]) -> Path:
     """
     Validate that the given path points to an existing image-like file.
@@ -152,6 +251,9 @@ def get_logs_dir() -> Path:
 
 __all__ = [
     "generate_output_filename",
+    "output_image_ext",
+    "save_output_image",
+    "save_output_array",
     "validate_image_file",
     "save_upload_file",
     "resolve_image_path",
@@ -0,0 +1,166 @@
+# pipelines/_approx_cache.py
+#
+# Approximate result cache for TXT2IMG: prompts are embedded with a small
+# sentence-transformer and looked up by cosine similarity in a FAISS index.
+#
+#   - hit  (similarity >= hit_threshold, same generation params):
+#       the cached image file is reused as-is
+#   - near (similarity >= near_threshold, same generation params):
+#       the cached image seeds a short img2img pass instead of a full denoise
+#
+# Enabled with RENDEREXPO_APPROX_CACHE=1; needs faiss and
+# sentence-transformers, otherwise get_approx_cache() returns None.
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    from logs.log_utils import get_logger  # type: ignore
+except ImportError:
+    import logging
+
+    logging.basicConfig(level=logging.INFO)
+
+    def get_logger(name: str):
+        return logging.getLogger(name)
+
+try:
+    import faiss  # type: ignore
+    import numpy as np  # type: ignore
+    from sentence_transformers import SentenceTransformer  # type: ignore
+except ImportError:  # pragma: no cover - optional dependencies
+    faiss = None  # type: ignore
+    np = None  # type: ignore
+    SentenceTransformer = None  # type: ignore
+
+logger = get_logger(__name__)
+
+_APPROX_CACHE_ENABLED = os.environ.get("RENDEREXPO_APPROX_CACHE") == "1"
+
+if _APPROX_CACHE_ENABLED and (SentenceTransformer is None or faiss is None):
+    logger.warning(
+        "RENDEREXPO_APPROX_CACHE=1 but faiss / sentence-transformers are not installed."
+    )
+    _APPROX_CACHE_ENABLED = False
+
+_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Candidates fetched per lookup before filtering on exact params.
+_SEARCH_K = 8
+
+
+@dataclass
+class _Entry:
+    params_key: Hashable
+    path: Path
+    hits: int = 0
+
+
+class ApproxImageCache:
+    """
+    Bounded prompt-similarity cache of generated image files.
+
+    Eviction drops the entry with the fewest hits (oldest first on ties),
+    so popular prompts stay resident while one-offs cycle out.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        hit_threshold: float = 0.95,
+        near_threshold: float = 0.88,
+    ) -> None:
+        self.max_entries = max_entries
+        self.hit_threshold = hit_threshold
+        self.near_threshold = near_threshold
+
+        self._model = SentenceTransformer(_EMBED_MODEL)
+        dim = self._model.get_sentence_embedding_dimension()
+        self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        self._entries: Dict[int, _Entry] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, prompt: str) -> Any:
+        vector = self._model.encode([prompt], normalize_embeddings=True)
+        return np.asarray(vector, dtype="float32")
+
+    def lookup(self, prompt: str, params_key: Hashable) -> Optional[Tuple[str, Path]]:
+        """
+        Return ("hit" | "near", cached image path), or None on a miss.
+        """
+        query = self._embed(prompt)
+        with self._lock:
+            if not self._entries:
+                return None
+            scores, ids = self._index.search(query, min(_SEARCH_K, len(self._entries)))
+
+            for score, entry_id in zip(scores[0], ids[0]):
+                if score < self.near_threshold:
+                    break  # results are sorted by similarity
+                entry = self._entries.get(int(entry_id))
+                if entry is None or entry.params_key != params_key:
+                    continue
+                if not entry.path.is_file():  # output was cleaned up
+                    self._remove(int(entry_id))
+                    continue
+
+                entry.hits += 1
+                kind = "hit" if score >= self.hit_threshold else "near"
+                return kind, entry.path
+        return None
+
+    def add(self, prompt: str, params_key: Hashable, path: Path) -> None:
+        vector = self._embed(prompt)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                victim = min(self._entries, key=lambda i: (self._entries[i].hits, i))
+                self._remove(victim)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = _Entry(params_key=params_key, path=Path(path))
+
+    def discard(self, path: Path) -> None:
+        """
+        Drop every entry pointing at `path` (e.g. the file was cleaned up
+        after lookup() returned it).
+        """
+        path = Path(path)
+        with self._lock:
+            for entry_id in [i for i, e in self._entries.items() if e.path == path]:
+                self._remove(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        self._index.remove_ids(np.array([entry_id], dtype="int64"))
+        self._entries.pop(entry_id, None)
+
+
+_CACHE: Optional[ApproxImageCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_approx_cache() -> Optional[ApproxImageCache]:
+    """
+    Process-wide cache, or None when disabled / dependencies are missing.
+    """
+    global _CACHE
+
+    if not _APPROX_CACHE_ENABLED:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            logger.info("Loading approximate TXT2IMG cache (embedder=%s).", _EMBED_MODEL)
+            _CACHE = ApproxImageCache()
+    return _CACHE
+
+
+__all__ = [
+    "ApproxImageCache",
+    "get_approx_cache",
+]
@@ -0,0 +1,282 @@
+# pipelines/_img2img_base.py
+#
+# Shared IMG2IMG request path for sd3_img2img.py and sdxl_img2img.py.
+# Both modules keep their public run_img2img(...) signatures and only
+# supply what actually differs: the real wrapper class, the outputs dir and
+# how the opened init image is handed to the real pipeline.
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    from logs.log_utils import get_logger  # type: ignore
+except ImportError:
+    import logging
+
+    logging.basicConfig(level=logging.INFO)
+
+    def get_logger(name: str):
+        return logging.getLogger(name)
+
+from config import app_config  # type: ignore
+from file_utils import (  # type: ignore
+    generate_output_filename,
+    output_image_ext,
+    save_output_image,
+    validate_image_file,
+)
+
+from .pipeline_manager import get_img2img_pipeline
+
+from PIL import Image, ImageOps
+
+logger = get_logger(__name__)
+
+
+def _debug_info(pipeline_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Small, JSON-safe subset of a wrapper result for the response's "debug"
+    field (the full result repeats params and can carry large values).
+    """
+    params = pipeline_result.get("params") or {}
+    debug: Dict[str, Any] = {
+        "device": pipeline_result.get("device"),
+        "pipeline_type": pipeline_result.get("type"),
+        "model_id": pipeline_result.get("model_id"),
+        "model_name": pipeline_result.get("model_name"),
+    }
+    for key in ("seed", "scheduler", "latents_shape"):
+        value = pipeline_result.get(key, params.get(key))
+        if value is not None:
+            debug[key] = value
+    return debug
+
+
+# Image encoding runs here instead of on the request thread.
+_SAVE_POOL = ThreadPoolExecutor(
+    max_workers=max(2, (os.cpu_count() or 2) // 2),
+    thread_name_prefix="img2img-save",
+)
+
+
+def _as_rgb(image: Image.Image) -> Image.Image:
+    """
+    Prepare an opened image for the pipeline, applying EXIF orientation in
+    place and converting to RGB only when it is not already RGB.
+    """
+    ImageOps.exif_transpose(image, in_place=True)
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def _open_rgb(path: Path) -> Image.Image:
+    """
+    Open the init image for the pipeline (the only place it is opened with
+    PIL on the default path) and prepare it with _as_rgb().
+    """
+    return _as_rgb(Image.open(path))
+
+
+def _write_placeholder(init_path: Path, out_path: Path) -> Path:
+    """
+    Put the init image bytes at out_path (keeping the init image's extension)
+    without decoding/re-encoding: hardlink when possible, else a plain copy.
+    Returns the path actually written.
+    """
+    out_path = out_path.with_suffix(init_path.suffix)
+    try:
+        os.link(init_path, out_path)
+    except OSError:
+        shutil.copyfile(init_path, out_path)
+    return out_path
+
+
+def _save_output(pil_image: Image.Image, init_image_path: Path, output_path: Path) -> None:
+    """
+    Background task: save the generated image in the configured output
+    format (fast-compressed PNG by default).
+    If that fails, re-encode the init image to the same reserved path (in
+    the same output format, so the file matches its suffix) so
+    output_image_path always points at a real file.
+    """
+    try:
+        save_output_image(pil_image, output_path)
+        logger.info("Saved REAL IMG2IMG image to %s", output_path)
+        return
+    except Exception as e:  # noqa: BLE001
+        logger.error(
+            "Failed to save REAL IMG2IMG image to %s. Error: %s",
+            output_path,
+            e,
+        )
+
+    # Fallback: re-encode the init image. The path (and its suffix) is
+    # already in the response, so the raw init bytes cannot be copied there.
+    try:
+        with Image.open(init_image_path) as init_image:
+            save_output_image(_as_rgb(init_image), output_path)
+        logger.info(
+            "Wrote placeholder IMG2IMG output by re-encoding init image to %s.",
+            output_path,
+        )
+    except Exception as e2:  # noqa: BLE001
+        logger.error(
+            "Failed to write placeholder IMG2IMG output to %s. Error: %s",
+            output_path,
+            e2,
+        )
+
+
+def run_img2img_common(
+    prompt: str,
+    init_image_path: Union[str, Path],
+    real_cls: type,
+    *,
+    model_id: str,
+    outputs_dir: Path,
+    prepare_init_image: Optional[Callable[[Path, Any], Any]] = None,
+    negative_prompt: Optional[str] = None,
+    strength: Optional[float] = None,
+    cfg_scale: Optional[float] = None,
+    num_inference_steps: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    real_kwargs: Optional[Dict[str, Any]] = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """
+    IMG2IMG request body shared by the SD3.5 and SDXL entry points.
+
+    Behavior:
+      - Validates the input image path (no decode).
+      - Gets a pipeline via get_img2img_pipeline(...).
+      - If it is a `real_cls` instance: loads the init image with
+        prepare_init_image(path, pipeline) (default: RGB PIL), runs it,
+        and saves the output image in the background.
+      - Otherwise (Dummy): runs with init_image_info only and copies the
+        init image as a placeholder.
+      - Ensures there is ALWAYS a real file at output_image_path.
+
+    real_kwargs are passed to the real pipeline's .run() only (e.g. seed).
+    """
+    init_image_path = Path(init_image_path)
+    logger.info(
+        "IMG2IMG request received: prompt=%r, model_id=%s, init_image=%s",
+        prompt,
+        model_id,
+        init_image_path,
+    )
+
+    # Validate the input image.
+    validate_image_file(init_image_path)
+
+    # Fill in defaults from config if values are not provided.
+    strength = strength if strength is not None else app_config.img2img_default_strength
+    cfg_scale = cfg_scale or app_config.img2img_default_cfg_scale
+    num_inference_steps = (
+        num_inference_steps or app_config.img2img_default_inference_steps
+    )
+    width = width or app_config.img2img_default_width
+    height = height or app_config.img2img_default_height
+
+    filename = generate_output_filename(prefix="img2img", ext=output_image_ext())
+    output_path = outputs_dir / filename
+
+    # Get (or lazily create) the pipeline instance.
+    pipeline = get_img2img_pipeline(model_id=model_id)
+
+    init_image_info = {
+        "path": str(init_image_path),
+    }
+
+    # -------------------------------------------------------------------
+    # Decide how to call .run() based on the actual pipeline type.
+    # -------------------------------------------------------------------
+    if isinstance(pipeline, real_cls):
+        logger.info("Using REAL IMG2IMG pipeline %s.", real_cls.__name__)
+        if prepare_init_image is None:
+            init_image = _open_rgb(init_image_path)
+        else:
+            init_image = prepare_init_image(init_image_path, pipeline)
+
+        pipeline_result = pipeline.run(
+            prompt=prompt,
+            init_image=init_image,
+            negative_prompt=negative_prompt,
+            strength=strength,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=cfg_scale,
+            width=width,
+            height=height,
+            **(real_kwargs or {}),
+            **extra,
+        )
+    else:
+        # Dummy path: no real image processing.
+        logger.info("Using Dummy IMG2IMG pipeline (no real transformation).")
+        pipeline_result = pipeline.run(
+            prompt=prompt,
+            init_image_info=init_image_info,
+            negative_prompt=negative_prompt,
+            strength=strength,
+            cfg_scale=cfg_scale,
+            num_inference_steps=num_inference_steps,
+            width=width,
+            height=height,
+            **extra,
+        )
+
+    # -------------------------------------------------------------------
+    # Try to get a real PIL image from the pipeline.
+    # If we don't get one, we fall back to copying the init image.
+    # -------------------------------------------------------------------
+    pil_image = pipeline_result.pop("pil_image", None)
+
+    if pil_image is not None:
+        # Normal path: real output, encoded in the background.
+        # output_image_path is reserved now; the file appears once saved.
+        _SAVE_POOL.submit(_save_output, pil_image, init_image_path, output_path)
+    else:
+        # Fallback: ensure there is ALWAYS a file at output_path.
+        try:
+            output_path = _write_placeholder(init_image_path, output_path)
+            logger.info(
+                "No 'pil_image' in pipeline_result; copied init_image to %s "
+                "as a placeholder.",
+                output_path,
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.error(
+                "Failed to write placeholder IMG2IMG output to %s. Error: %s",
+                output_path,
+                e,
+            )
+
+    # Build JSON-serializable response (no PIL objects).
+    response: Dict[str, Any] = {
+        "status": "ok",
+        "type": "img2img",
+        "engine": pipeline_result.get("model_name"),
+        "model_id": pipeline_result.get("model_id", model_id),
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "init_image_path": str(init_image_path),
+        # SD3.5 rounds sizes to a multiple of 16; report what was rendered.
+        "width": pipeline_result.get("width", width),
+        "height": pipeline_result.get("height", height),
+        "strength": strength,
+        "cfg_scale": cfg_scale,
+        "num_inference_steps": num_inference_steps,
+        "output_image_path": str(output_path),
+        "params": pipeline_result.get("params", {}),
+        "debug": _debug_info(pipeline_result),
+    }
+
+    return response
+
+
+__all__ = [
+    "run_img2img_common",
+]
@@ -14,15 +14,14 @@ These are *prompt helpers* only:
 Everything here is 100% "text prompt" level — no models/licenses involved.
 """
 
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
 
 
-def _architecture_styles() -> Dict[str, Dict[str, Any]]:
-    """
-    High-level architectural style presets.
-    Keys are meant to be stable API IDs (no spaces, lowercase).
-    """
-    return {
+_PRESETS_RAW: Dict[str, Dict[str, Dict[str, Any]]] = {
+    # High-level architectural style presets.
+    # Keys are meant to be stable API IDs (no spaces, lowercase).
+    "architecture_styles": {
         "modern_minimal": {
             "label": "Modern Minimal",
             "description": "Clean lines, large openings, neutral palette, minimal ornament",
@@ -83,11 +82,9 @@ def _architecture_styles() -> Dict[str, Dict[str, Any]]:
             "negative_snippet": "sci-fi, brutalist, hyper-modern",
             "tags": ["architecture", "exterior", "heritage"],
         },
-    }
+    },
 
-
-def _interior_styles() -> Dict[str, Dict[str, Any]]:
-    return {
+    "interior_styles": {
         "japandi": {
             "label": "Japandi Calm Interior",
             "description": "Blend of Japanese and Scandinavian minimalism.",
@@ -138,11 +135,9 @@ def _interior_styles() -> Dict[str, Dict[str, Any]]:
             "negative_snippet": "overcrowded, noisy graphics, chaotic signage",
             "tags": ["interior", "retail", "gallery"],
         },
-    }
+    },
 
-
-def _landscape_site() -> Dict[str, Dict[str, Any]]:
-    return {
+    "landscape_site": {
         "desert_site": {
             "label": "Desert Site",
             "description": "Arid landscape, dunes or rocky terrain, sparse vegetation.",
@@ -193,11 +188,9 @@ def _landscape_site() -> Dict[str, Dict[str, Any]]:
             "negative_snippet": "open field, generic park",
             "tags": ["landscape", "courtyard", "urban"],
         },
-    }
-
+    },
 
-def _lighting_presets() -> Dict[str, Dict[str, Any]]:
-    return {
+    "lighting": {
         "day_soft": {
             "label": "Soft Daylight",
             "description": "Overcast or softly diffused daylight.",
@@ -246,11 +239,9 @@ def _lighting_presets() -> Dict[str, Dict[str, Any]]:
             "negative_snippet": "harsh flash, noisy background, clutter",
             "tags": ["lighting", "product", "furniture"],
         },
-    }
-
+    },
 
-def _camera_presets() -> Dict[str, Dict[str, Any]]:
-    return {
+    "camera": {
         "eye_level": {
             "label": "Eye-Level View",
             "description": "Standard human eye-level camera for realistic views.",
@@ -281,11 +272,9 @@ def _camera_presets() -> Dict[str, Dict[str, Any]]:
             "prompt_snippet": "close-up detail view, focus on materials and junctions",
             "tags": ["camera", "detail", "materials"],
         },
-    }
-
+    },
 
-def _mood_presets() -> Dict[str, Dict[str, Any]]:
-    return {
+    "mood": {
         "calm_residential": {
             "label": "Calm Residential",
             "description": "Quiet, livable mood, soft and welcoming.",
@@ -321,11 +310,9 @@ def _mood_presets() -> Dict[str, Dict[str, Any]]:
             ),
             "tags": ["mood", "office", "corporate"],
         },
-    }
+    },
 
-
-def _furniture_styles() -> Dict[str, Dict[str, Any]]:
-    return {
+    "furniture_styles": {
         "contemporary_clean": {
             "label": "Contemporary Clean",
             "description": "Simple, modern furniture with clean lines.",
@@ -353,27 +340,52 @@ def _furniture_styles() -> Dict[str, Dict[str, Any]]:
             ),
             "tags": ["furniture", "interior", "lounge"],
         },
-    }
+    },
+}
+
+# Read-only view shared by every caller (built once at import time).
+_PRESETS: Mapping[str, Dict[str, Dict[str, Any]]] = MappingProxyType(_PRESETS_RAW)
+
+
+# Backward-compatible aliases for the old per-group builder functions.
+def _architecture_styles() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["architecture_styles"]
+
+
+def _interior_styles() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["interior_styles"]
+
+
+def _landscape_site() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["landscape_site"]
+
+
+def _lighting_presets() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["lighting"]
+
+
+def _camera_presets() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["camera"]
+
+
+def _mood_presets() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["mood"]
+
+
+def _furniture_styles() -> Dict[str, Dict[str, Any]]:
+    return _PRESETS_RAW["furniture_styles"]
 
 
-def get_presets() -> Dict[str, Any]:
+def get_presets() -> Mapping[str, Any]:
     """
     Master dictionary returned by /v1/presets.
     Frontend can read this and build dropdowns / pills from it.
     """
-    return {
-        "architecture_styles": _architecture_styles(),
-        "interior_styles": _interior_styles(),
-        "landscape_site": _landscape_site(),
-        "lighting": _lighting_presets(),
-        "camera": _camera_presets(),
-        "mood": _mood_presets(),
-        "furniture_styles": _furniture_styles(),
-    }
+    return _PRESETS
 
 
 # Optional alias if main.py imports a different name
-def list_presets() -> Dict[str, Any]:
+def list_presets() -> Mapping[str, Any]:
     return get_presets()
 
 
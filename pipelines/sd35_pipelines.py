@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import os
+import threading
 
 try:
     from logs.log_utils import get_logger  # type: ignore
@@ -16,21 +18,40 @@ except ImportError:
         return logging.getLogger(name)
 
 
+from PIL import Image
+
 logger = get_logger(__name__)
 
 # Optional imports – we keep things graceful if deps are missing.
 try:
+    import numpy as np
     import torch
-    from diffusers import DiffusionPipeline
+    from diffusers import AutoPipelineForImage2Image, DiffusionPipeline
 except ImportError:  # pragma: no cover - graceful degradation
+    np = None  # type: ignore
     torch = None  # type: ignore
+    AutoPipelineForImage2Image = None  # type: ignore
     DiffusionPipeline = None  # type: ignore
     logger.warning(
         "SD3.5 dependencies (torch/diffusers) are not installed. "
         "SD3.5 pipelines will not be usable until they are."
     )
 
+# Optional quantization backends (only needed when SD35_QUANT is set).
+try:
+    from diffusers import BitsAndBytesConfig as DiffusersBnbConfig
+    from diffusers import SD3Transformer2DModel
+except ImportError:  # pragma: no cover - older diffusers / no bitsandbytes
+    DiffusersBnbConfig = None  # type: ignore
+    SD3Transformer2DModel = None  # type: ignore
+
+try:
+    from torchao.quantization import float8_weight_only, int8_weight_only, quantize_
+except ImportError:  # pragma: no cover - torchao is optional
+    quantize_ = None  # type: ignore
+
 from models.registry import get_model_info, ModelInfo  # type: ignore
+from runtime.executors import MicroBatcher  # type: ignore
 
 
 # -------------------------------------------------------------------
@@ -54,13 +75,14 @@ def _select_device_and_dtype() -> Tuple[str, "torch.dtype"]:
     Decide whether to use CPU or GPU and which dtype to use.
 
     - On your local machine (likely no CUDA): CPU + float32
-    - On RunPod A6000: CUDA + float16
+    - On RunPod A6000: CUDA + bfloat16 (SD3.5 is trained in bf16, and it
+      avoids the fp16 overflow/NaN issues at the same tensor-core speed)
     """
     assert torch is not None  # for type-checkers
 
     if torch.cuda.is_available():
-        logger.info("CUDA is available – using GPU (float16) for SD3.5.")
-        return "cuda", torch.float16
+        logger.info("CUDA is available – using GPU (bfloat16) for SD3.5.")
+        return "cuda", torch.bfloat16
     else:
         logger.info("CUDA is NOT available – using CPU (float32) for SD3.5.")
         return "cpu", torch.float32
@@ -80,11 +102,238 @@ def _log_hf_env() -> None:
     )
 
 
+# SD3.5 needs sides divisible by vae_scale_factor (8) * transformer patch
+# size (2); anything else makes diffusers raise inside the pipeline.
+_HW_MULTIPLE = 16
+_DEFAULT_SIDE = 1024
+_MIN_SIDE = 256
+_MAX_SIDE = 2048
+
+
+@lru_cache(maxsize=64)
+def _canonicalize_hw(width: Optional[int], height: Optional[int]) -> Tuple[int, int]:
+    """
+    Return (width, height) rounded down to a multiple of 16, with 1024
+    defaults. Raise ValueError for sizes outside [256, 2048].
+
+    A stable canonical shape also keeps the torch.compile caches hot.
+    """
+    width = width or _DEFAULT_SIDE
+    height = height or _DEFAULT_SIDE
+
+    for name, value in (("width", width), ("height", height)):
+        if not _MIN_SIDE <= value <= _MAX_SIDE:
+            raise ValueError(
+                f"SD3.5 {name} must be between {_MIN_SIDE} and {_MAX_SIDE}, got {value}."
+            )
+
+    return width // _HW_MULTIPLE * _HW_MULTIPLE, height // _HW_MULTIPLE * _HW_MULTIPLE
+
+
+# Flipped by _init_once() after the first successful check.
+_INITIALIZED = False
+
+
+def _init_once() -> None:
+    """
+    Run the dependency check and HF env log once per process.
+    Later pipeline creations skip both.
+    """
+    global _INITIALIZED
+    if _INITIALIZED:
+        return
+
+    _ensure_sd35_dependencies()
+    _log_hf_env()
+    _INITIALIZED = True
+
+
+# Weight quantization for the SD3.5 transformer (CUDA only):
+#   - "" (default): plain bf16 weights
+#   - "int8":         bitsandbytes 8-bit via diffusers' BitsAndBytesConfig
+#   - "torchao-int8": TorchAO int8 weight-only
+#   - "torchao-fp8":  TorchAO float8 weight-only (Ada/Hopper)
+_QUANT_MODE = os.environ.get("SD35_QUANT", "").strip().lower()
+
+
+def _load_bnb_int8_transformer(repo_id: str, dtype: "torch.dtype") -> Any:
+    """
+    Load only the SD3.5 transformer with bitsandbytes 8-bit weights.
+    Returns None (and logs) if the backend is not installed.
+    """
+    if DiffusersBnbConfig is None or SD3Transformer2DModel is None:
+        logger.warning(
+            "SD35_QUANT=int8 requested but diffusers BitsAndBytesConfig / "
+            "bitsandbytes is not available – loading unquantized weights."
+        )
+        return None
+
+    return SD3Transformer2DModel.from_pretrained(
+        repo_id,
+        subfolder="transformer",
+        quantization_config=DiffusersBnbConfig(load_in_8bit=True),
+        torch_dtype=dtype,
+    )
+
+
+def _quantize_torchao(pipe: Any) -> None:
+    """
+    Apply TorchAO weight-only quantization to the transformer in place.
+    """
+    if quantize_ is None:
+        logger.warning(
+            "SD35_QUANT=%s requested but torchao is not installed – "
+            "keeping unquantized weights.",
+            _QUANT_MODE,
+        )
+        return
+
+    if _QUANT_MODE == "torchao-fp8":
+        quantize_(pipe.transformer, float8_weight_only())
+    else:
+        quantize_(pipe.transformer, int8_weight_only())
+
+
+def _load_diffusion_pipeline(repo_id: str, device: str, dtype: "torch.dtype") -> Any:
+    """
+    Load a DiffusionPipeline onto the selected device.
+
+    - On CUDA: accelerate streams the safetensors shards straight onto the GPU
+      (low_cpu_mem_usage + device_map), so weights are never fully materialized
+      in host RAM and there is no second host->device copy pass.
+    - On CPU: plain from_pretrained(...).to("cpu"), unchanged.
+
+    NOTE:
+      diffusers only accepts device_map="balanced" at the pipeline level
+      ("auto" is reserved for individual models); on a single GPU it places
+      every component on cuda:0.
+
+    On CUDA the transformer is optionally quantized according to SD35_QUANT.
+    """
+    # IMPORTANT:
+    # We rely on HF_TOKEN being set in the environment if the repo is gated.
+    # DiffusionPipeline.from_pretrained will use that automatically via
+    # huggingface_hub auth.
+    if device == "cuda":
+        extra: Dict[str, Any] = {}
+        if _QUANT_MODE == "int8":
+            transformer = _load_bnb_int8_transformer(repo_id, dtype)
+            if transformer is not None:
+                extra["transformer"] = transformer
+
+        pipe = DiffusionPipeline.from_pretrained(
+            repo_id,
+            torch_dtype=dtype,
+            use_safetensors=True,
+            low_cpu_mem_usage=True,
+            device_map="balanced",
+            **extra,
+        )
+
+        if _QUANT_MODE.startswith("torchao-"):
+            _quantize_torchao(pipe)
+
+        return pipe
+
+    pipe = DiffusionPipeline.from_pretrained(
+        repo_id,
+        torch_dtype=dtype,
+        use_safetensors=True,
+    )
+    return pipe.to(device)
+
+
+def _noop() -> None:
+    """Default for optional pipeline methods that a pipeline class lacks."""
+
+
+# Below this much free VRAM we fall back to attention slicing on CUDA.
+_LOW_VRAM_BYTES = 12 * 1024**3
+
+
+def _enable_memory_options(pipe: Any, device: str) -> None:
+    """
+    Configure attention / VAE memory options for a freshly loaded pipeline.
+
+    - CUDA: fused memory-efficient attention (xFormers if installed, otherwise
+      PyTorch 2 SDPA, which diffusers uses by default). Attention slicing only
+      engages on low-VRAM cards, and the VAE uses tiling for large outputs.
+    - CPU: keep the original slicing options.
+    """
+    if device == "cuda":
+        try:
+            pipe.enable_xformers_memory_efficient_attention()
+        except Exception:  # noqa: BLE001 - xformers missing/unsupported -> SDPA
+            logger.info("xFormers not available – using PyTorch SDPA attention.")
+
+        free_bytes, _ = torch.cuda.mem_get_info()
+        if free_bytes < _LOW_VRAM_BYTES:
+            logger.info(
+                "Low free VRAM (%.1f GB) – enabling attention slicing.",
+                free_bytes / 1024**3,
+            )
+            getattr(pipe, "enable_attention_slicing", _noop)()
+
+        if getattr(pipe, "vae", None) is not None:
+            pipe.vae.enable_tiling()
+        return
+
+    for method in ("enable_vae_slicing", "enable_attention_slicing"):
+        getattr(pipe, method, _noop)()
+
+
+# Set SD35_TORCH_COMPILE=0 to skip torch.compile (e.g. for quick debug pods).
+_TORCH_COMPILE_ENABLED = os.environ.get("SD35_TORCH_COMPILE", "1") != "0"
+
+# Resolutions the compiled graph is warmed up at during create(), so the
+# first request at the canonical dashboard sizes does not pay for compiling.
+_WARMUP_RESOLUTIONS: Tuple[Tuple[int, int], ...] = ((768, 768), (1024, 1024))
+
+
+def _compile_pipeline(pipe: Any, device: str) -> None:
+    """
+    torch.compile the transformer forward and the VAE decode on CUDA.
+
+    This fuses the pointwise ops around attention/MLP and cuts Python
+    dispatch overhead on every denoising step. The default mode is used,
+    not "reduce-overhead": calls arrive on any asyncio.to_thread / request
+    thread, and cudagraph trees keep their graphs and memory pool per
+    thread, so each thread would re-record and hold its own pool.
+    """
+    # bitsandbytes int8 layers do not compile cleanly; TorchAO ones do.
+    if device != "cuda" or not _TORCH_COMPILE_ENABLED or _QUANT_MODE == "int8":
+        return
+
+    pipe.transformer = torch.compile(pipe.transformer)
+    pipe.vae.decode = torch.compile(pipe.vae.decode)
+
+
+def _warmup_pipeline(pipe: Any, device: str) -> None:
+    """
+    Run one single-step generation per warm-up resolution so the compiled
+    kernels for those shapes are built before the first real request
+    arrives. Compiled code is shared across threads, so warming up on the
+    creating thread covers every caller.
+    """
+    if device != "cuda" or not _TORCH_COMPILE_ENABLED or _QUANT_MODE == "int8":
+        return
+
+    for width, height in _WARMUP_RESOLUTIONS:
+        logger.info("Warming up compiled SD3.5 pipeline at %sx%s...", width, height)
+        with torch.inference_mode():
+            pipe(
+                prompt="warmup",
+                width=width,
+                height=height,
+                num_inference_steps=1,
+            )
+
+
 # -------------------------------------------------------------------
 # SD3.5 TXT2IMG Pipeline Wrapper
 # -------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class SD35Txt2ImgPipelineWrapper:
     """
     Thin wrapper around a diffusers DiffusionPipeline for SD3.5 TXT2IMG.
@@ -102,8 +351,7 @@ class SD35Txt2ImgPipelineWrapper:
 
     @classmethod
     def create(cls, model_id: str = "sd3.5-large") -> "SD35Txt2ImgPipelineWrapper":
-        _ensure_sd35_dependencies()
-        _log_hf_env()
+        _init_once()
 
         model_info = get_model_info(model_id)
         logger.info(
@@ -114,23 +362,12 @@ class SD35Txt2ImgPipelineWrapper:
 
         device, dtype = _select_device_and_dtype()
 
-        # IMPORTANT:
-        # We rely on HF_TOKEN being set in the environment if the repo is gated.
-        # DiffusionPipeline.from_pretrained will use that automatically via
-        # huggingface_hub auth.
-        pipe = DiffusionPipeline.from_pretrained(
-            model_info.repo_id,
-            torch_dtype=dtype,
-            use_safetensors=True,
-        )
-
-        pipe = pipe.to(device)
+        pipe = _load_diffusion_pipeline(model_info.repo_id, device, dtype)
 
         # Memory-friendly options
-        if hasattr(pipe, "enable_vae_slicing"):
-            pipe.enable_vae_slicing()
-        if hasattr(pipe, "enable_attention_slicing"):
-            pipe.enable_attention_slicing()
+        _enable_memory_options(pipe, device)
+        _compile_pipeline(pipe, device)
+        _warmup_pipeline(pipe, device)
 
         logger.info(
             "SD3.5 TXT2IMG pipeline created on device=%s (dtype=%s)",
@@ -142,31 +379,47 @@ class SD35Txt2ImgPipelineWrapper:
 
     def run(
         self,
-        prompt: str,
+        prompt: Union[str, List[str]],
         negative_prompt: Optional[str] = None,
         width: Optional[int] = None,
         height: Optional[int] = None,
         num_inference_steps: int = 30,
         guidance_scale: float = 7.0,
-        seed: Optional[int] = None,
+        seed: Union[Optional[int], List[Optional[int]]] = None,
         **kwargs: Any,
     ) -> Dict[str, Any]:
         """
         Run SD3.5 TXT2IMG and return a dict with:
-          - PIL image
+          - PIL image ("pil_image", the first image)
+          - all PIL images ("pil_images", one per prompt when batched)
           - metadata useful for logging and API responses
+
+        `prompt` may be a list of prompts; they run as a single batched
+        forward pass. `seed` may then be a list with one seed (or None) per
+        prompt: every prompt gets its own generator, so a seeded prompt
+        gives the same image batched or alone.
         """
         assert torch is not None  # type: ignore
 
-        logger.info(
+        width, height = _canonicalize_hw(width, height)
+
+        logger.debug(
             "Running REAL SD3.5 TXT2IMG on device=%s for model_id=%s",
             self.device,
             self.model_info.id,
         )
 
+        # CPU generator: diffusers' randn_tensor draws the noise on CPU and
+        # moves it to the device, so no CUDA generator/sync per request and
+        # seeds reproduce the same image on CPU and GPU.
         generator = None
-        if seed is not None:
-            generator = torch.Generator(device=self.device).manual_seed(seed)
+        if isinstance(seed, list):
+            generator = [
+                torch.Generator().manual_seed(s) if s is not None else _unseeded_generator()
+                for s in seed
+            ]
+        elif seed is not None:
+            generator = torch.Generator().manual_seed(seed)
 
         result = self.pipe(
             prompt=prompt,
@@ -180,13 +433,14 @@ class SD35Txt2ImgPipelineWrapper:
         )
 
         # Most diffusers pipelines return an object with .images (list of PIL images)
-        image = result.images[0]
+        images = result.images
 
         return {
             "type": "txt2img",
             "model_id": self.model_info.id,
             "model_name": self.model_info.display_name,
-            "pil_image": image,
+            "pil_image": images[0],
+            "pil_images": images,
             "num_inference_steps": num_inference_steps,
             "guidance_scale": guidance_scale,
             "width": width,
@@ -195,11 +449,90 @@ class SD35Txt2ImgPipelineWrapper:
         }
 
 
+def _unseeded_generator() -> Any:
+    generator = torch.Generator()
+    generator.seed()  # non-deterministic, like an unseeded pipe(...) call
+    return generator
+
+
+def _init_image_to_device(init_image: Any, device: str) -> Any:
+    """
+    Upload a PIL init image to the GPU through pinned host memory.
+
+    The uint8 pixels are pinned and copied with non_blocking=True (so the
+    PCIe transfer overlaps with the scheduler/text-encoder prep and moves a
+    quarter of the bytes a float tensor would), then normalized to [0, 1]
+    on the GPU - the range diffusers' image processor accepts for tensors.
+    Returns a (1, 3, H, W) float tensor. Anything that is not a PIL image
+    (e.g. an already-prepared tensor), or a CPU run, is returned unchanged.
+    """
+    if device != "cuda" or not isinstance(init_image, Image.Image):
+        return init_image
+
+    array = np.asarray(init_image.convert("RGB") if init_image.mode != "RGB" else init_image)
+    tensor = torch.from_numpy(array).pin_memory().to(device, non_blocking=True)
+    return tensor.permute(2, 0, 1).unsqueeze(0).float().div_(255.0)
+
+
+# -------------------------------------------------------------------
+# Micro-batching for concurrent TXT2IMG requests
+# -------------------------------------------------------------------
+
+class BatchingExecutor:
+    """
+    Coalesces concurrent single-prompt TXT2IMG calls into batched run() calls.
+
+    Requests are collected for up to `max_wait_s` (or until `max_batch`
+    prompts are queued). Requests with identical generation params are run
+    as one batched forward pass in a worker thread, and each caller gets
+    back its own result dict.
+
+    Usage (from async FastAPI code):
+        batcher = BatchingExecutor(create_sd35_txt2img_pipeline())
+        result = await batcher.submit("a modern villa", width=1024, height=1024)
+    """
+
+    def __init__(
+        self,
+        wrapper: SD35Txt2ImgPipelineWrapper,
+        max_batch: int = 4,
+        max_wait_s: float = 0.05,
+    ) -> None:
+        self.wrapper = wrapper
+        # Only requests with identical params can share a forward pass.
+        # Seeds differ per request; each prompt gets its own generator.
+        self._batcher: MicroBatcher[Tuple[str, Optional[int], Dict[str, Any]], Dict[str, Any]] = (
+            MicroBatcher(
+                group_key=lambda request: request[2],
+                render=self._run_group,
+                max_batch=max_batch,
+                max_wait_s=max_wait_s,
+            )
+        )
+
+    async def submit(self, prompt: str, **params: Any) -> Dict[str, Any]:
+        params = dict(params)
+        seed = params.pop("seed", None)
+        return await self._batcher.submit((prompt, seed, params))
+
+    def _run_group(
+        self, requests: List[Tuple[str, Optional[int], Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        prompts = [prompt for prompt, _, _ in requests]
+        seeds = [seed for _, seed, _ in requests]
+        result = self.wrapper.run(prompt=prompts, seed=seeds, **requests[0][2])
+
+        return [
+            {**result, "pil_image": image, "pil_images": [image]}
+            for image in result["pil_images"]
+        ]
+
+
 # -------------------------------------------------------------------
 # SD3.5 IMG2IMG Pipeline Wrapper
 # -------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class SD35Img2ImgPipelineWrapper:
     """
     Thin wrapper around a diffusers DiffusionPipeline for SD3.5 IMG2IMG.
@@ -223,8 +556,7 @@ class SD35Img2ImgPipelineWrapper:
 
     @classmethod
     def create(cls, model_id: str = "sd3.5-large") -> "SD35Img2ImgPipelineWrapper":
-        _ensure_sd35_dependencies()
-        _log_hf_env()
+        _init_once()
 
         model_info = get_model_info(model_id)
         logger.info(
@@ -235,18 +567,10 @@ class SD35Img2ImgPipelineWrapper:
 
         device, dtype = _select_device_and_dtype()
 
-        pipe = DiffusionPipeline.from_pretrained(
-            model_info.repo_id,
-            torch_dtype=dtype,
-            use_safetensors=True,
-        )
-
-        pipe = pipe.to(device)
+        pipe = _load_diffusion_pipeline(model_info.repo_id, device, dtype)
 
-        if hasattr(pipe, "enable_vae_slicing"):
-            pipe.enable_vae_slicing()
-        if hasattr(pipe, "enable_attention_slicing"):
-            pipe.enable_attention_slicing()
+        _enable_memory_options(pipe, device)
+        _compile_pipeline(pipe, device)
 
         logger.info(
             "SD3.5 IMG2IMG pipeline created on device=%s (dtype=%s)",
@@ -256,6 +580,35 @@ class SD35Img2ImgPipelineWrapper:
 
         return cls(model_info=model_info, pipe=pipe, device=device)
 
+    @classmethod
+    def from_txt2img(
+        cls, txt2img: SD35Txt2ImgPipelineWrapper
+    ) -> "SD35Img2ImgPipelineWrapper":
+        """
+        Build an IMG2IMG wrapper on top of an already-loaded TXT2IMG wrapper.
+
+        diffusers' from_pipe(...) reuses the transformer / VAE / text encoders
+        of the existing pipeline, so no weights are loaded a second time. The
+        scheduler is private: it keeps per-run state (timesteps, step index)
+        and TXT2IMG calls run concurrently with IMG2IMG ones.
+        """
+        _init_once()
+
+        scheduler = txt2img.pipe.scheduler
+        pipe = AutoPipelineForImage2Image.from_pipe(
+            txt2img.pipe,
+            scheduler=scheduler.__class__.from_config(scheduler.config),
+        )
+
+        logger.info(
+            "SD3.5 IMG2IMG pipeline created from cached TXT2IMG pipeline "
+            "for model_id=%s (device=%s)",
+            txt2img.model_info.id,
+            txt2img.device,
+        )
+
+        return cls(model_info=txt2img.model_info, pipe=pipe, device=txt2img.device)
+
     def run(
         self,
         prompt: str,
@@ -276,19 +629,24 @@ class SD35Img2ImgPipelineWrapper:
         """
         assert torch is not None  # type: ignore
 
-        logger.info(
+        width, height = _canonicalize_hw(width, height)
+
+        logger.debug(
             "Running REAL SD3.5 IMG2IMG on device=%s for model_id=%s",
             self.device,
             self.model_info.id,
         )
 
+        # CPU generator: diffusers' randn_tensor draws the noise on CPU and
+        # moves it to the device, so no CUDA generator/sync per request and
+        # seeds reproduce the same image on CPU and GPU.
         generator = None
         if seed is not None:
-            generator = torch.Generator(device=self.device).manual_seed(seed)
+            generator = torch.Generator().manual_seed(seed)
 
         result = self.pipe(
             prompt=prompt,
-            image=init_image,
+            image=_init_image_to_device(init_image, self.device),
             negative_prompt=negative_prompt,
             strength=strength,
             num_inference_steps=num_inference_steps,
@@ -318,14 +676,30 @@ class SD35Img2ImgPipelineWrapper:
 # -------------------------------------------------------------------
 # Factories (for Pipeline Manager to use later)
 # -------------------------------------------------------------------
+# NOTE:
+#   SD3.5-large is a 10-20 GB load, so wrappers are cached per model_id
+#   for the lifetime of the process. The lock makes sure two concurrent
+#   requests never trigger two parallel from_pretrained(...) calls.
+# -------------------------------------------------------------------
+
+_TXT2IMG_CACHE: Dict[str, SD35Txt2ImgPipelineWrapper] = {}
+_IMG2IMG_CACHE: Dict[str, SD35Img2ImgPipelineWrapper] = {}
+_LOCK = threading.Lock()
+
 
 def create_sd35_txt2img_pipeline(
     model_id: str = "sd3.5-large",
 ) -> SD35Txt2ImgPipelineWrapper:
     """
     Factory used by the pipeline manager to get a REAL SD3.5 txt2img pipeline.
+    Returns the cached wrapper if this model_id was already loaded.
     """
-    return SD35Txt2ImgPipelineWrapper.create(model_id=model_id)
+    with _LOCK:
+        if model_id not in _TXT2IMG_CACHE:
+            _TXT2IMG_CACHE[model_id] = SD35Txt2ImgPipelineWrapper.create(
+                model_id=model_id
+            )
+        return _TXT2IMG_CACHE[model_id]
 
 
 def create_sd35_img2img_pipeline(
@@ -333,13 +707,29 @@ def create_sd35_img2img_pipeline(
 ) -> SD35Img2ImgPipelineWrapper:
     """
     Factory used by the pipeline manager to get a REAL SD3.5 img2img pipeline.
+    Returns the cached wrapper if this model_id was already loaded.
+
+    If a TXT2IMG wrapper for the same model_id is already cached, the
+    IMG2IMG wrapper shares its weights instead of loading them again.
     """
-    return SD35Img2ImgPipelineWrapper.create(model_id=model_id)
+    with _LOCK:
+        if model_id not in _IMG2IMG_CACHE:
+            txt2img = _TXT2IMG_CACHE.get(model_id)
+            if txt2img is not None:
+                _IMG2IMG_CACHE[model_id] = SD35Img2ImgPipelineWrapper.from_txt2img(
+                    txt2img
+                )
+            else:
+                _IMG2IMG_CACHE[model_id] = SD35Img2ImgPipelineWrapper.create(
+                    model_id=model_id
+                )
+        return _IMG2IMG_CACHE[model_id]
 
 
 __all__ = [
     "SD35Txt2ImgPipelineWrapper",
     "SD35Img2ImgPipelineWrapper",
+    "BatchingExecutor",
     "create_sd35_txt2img_pipeline",
     "create_sd35_img2img_pipeline",
 ]
@@ -1,5 +1,10 @@
+import asyncio
+import os
+import shutil
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 try:
     from logs.log_utils import get_logger  # type: ignore
@@ -12,9 +17,23 @@ except ImportError:
         return logging.getLogger(name)
 
 from config import app_config  # type: ignore
-from file_utils import generate_output_filename  # type: ignore
+from file_utils import (  # type: ignore
+    ensure_output_dir,
+    generate_output_filename,
+    output_image_ext,
+    save_output_image,
+)
 
-from .pipeline_manager import get_txt2img_pipeline
+from ._approx_cache import ApproxImageCache, get_approx_cache
+from .pipeline_manager import get_img2img_pipeline, get_txt2img_pipeline
+from .sd35_pipelines import (  # type: ignore
+    _HW_MULTIPLE,
+    BatchingExecutor,
+    SD35Img2ImgPipelineWrapper,
+    SD35Txt2ImgPipelineWrapper,
+)
+
+from PIL import Image
 
 logger = get_logger(__name__)
 
@@ -25,9 +44,127 @@ BACKEND_ROOT = Path(__file__).resolve().parents[1]
 OUTPUTS_DIR = BACKEND_ROOT / "outputs"
 
 
+# Image encoding runs here instead of on the request thread.
+_SAVE_POOL = ThreadPoolExecutor(
+    max_workers=max(2, (os.cpu_count() or 2) // 2),
+    thread_name_prefix="txt2img-save",
+)
+
+
 def _ensure_outputs_dir() -> Path:
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-    return OUTPUTS_DIR
+    return ensure_output_dir(OUTPUTS_DIR)
+
+
+def _log_save_result(output_path: Path, future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        logger.error("Failed to save SD3.5 image to %s: %s", output_path, error)
+    else:
+        logger.info("TXT2IMG: Saved real SD3.5 image to: %s", output_path)
+
+
+# -------------------------------------------------------------------
+# Approximate result cache (RENDEREXPO_APPROX_CACHE=1)
+# -------------------------------------------------------------------
+
+def _add_to_cache(
+    cache: ApproxImageCache,
+    prompt: str,
+    params_key: Tuple[Any, ...],
+    output_path: Path,
+    future: Future,
+) -> None:
+    if future.exception() is None:
+        cache.add(prompt, params_key, output_path)
+
+
+# img2img strength used to refine a near-hit instead of a full denoise.
+_NEAR_HIT_STRENGTH = 0.35
+
+
+def _rendered_hw(width: int, height: int) -> Tuple[int, int]:
+    """
+    The size SD3.5 actually renders (sides rounded down to a multiple of 16),
+    so 1000x1000 and 992x992 requests share approximate-cache entries.
+    """
+    return width // _HW_MULTIPLE * _HW_MULTIPLE, height // _HW_MULTIPLE * _HW_MULTIPLE
+
+
+def _approx_params_key(
+    model_id: str,
+    negative_prompt: Optional[str],
+    width: int,
+    height: int,
+    cfg_scale: float,
+    num_inference_steps: int,
+    seed: Optional[int],
+) -> Tuple[Any, ...]:
+    width, height = _rendered_hw(width, height)
+    return (model_id, negative_prompt, width, height, cfg_scale, num_inference_steps, seed)
+
+
+def _approx_generate(
+    cache: ApproxImageCache,
+    prompt: str,
+    params_key: Tuple[Any, ...],
+    model_id: str,
+    run_kwargs: Dict[str, Any],
+    output_path: Path,
+) -> Optional[Dict[str, Any]]:
+    """
+    Serve a request from the approximate cache if possible.
+
+    A hit links (or copies) the cached file to output_path and returns a
+    pipeline-style result carrying "cached_path"; a near-hit runs a short
+    SD3.5 img2img pass seeded with the cached image. Returns None on a miss,
+    including when the cached file has disappeared since the lookup (the
+    stale entry is dropped and the caller generates normally).
+    """
+    found = cache.lookup(prompt, params_key)
+    if found is None:
+        return None
+
+    kind, cached_path = found
+    if kind == "hit":
+        try:
+            try:
+                os.link(cached_path, output_path)
+            except OSError:
+                shutil.copyfile(cached_path, output_path)
+        except OSError as e:
+            logger.warning("TXT2IMG: cached image %s is gone (%s); regenerating.", cached_path, e)
+            cache.discard(cached_path)
+            return None
+        logger.info("TXT2IMG: approximate cache hit, reusing %s", cached_path)
+        width, height = _rendered_hw(run_kwargs["width"], run_kwargs["height"])
+        return {
+            "type": "txt2img",
+            "model_id": model_id,
+            "model_name": "approx-cache",
+            "cached_path": cached_path,
+            "width": width,
+            "height": height,
+            "params": {"prompt": prompt, **run_kwargs},
+        }
+
+    pipeline = get_img2img_pipeline(model_id=model_id)
+    if not isinstance(pipeline, SD35Img2ImgPipelineWrapper):
+        return None
+
+    logger.info("TXT2IMG: approximate cache near-hit, refining %s", cached_path)
+    try:
+        with Image.open(cached_path) as cached:
+            init_image = cached.convert("RGB")
+    except OSError as e:
+        logger.warning("TXT2IMG: cached image %s is gone (%s); regenerating.", cached_path, e)
+        cache.discard(cached_path)
+        return None
+    return pipeline.run(
+        prompt=prompt,
+        init_image=init_image,
+        strength=_NEAR_HIT_STRENGTH,
+        **run_kwargs,
+    )
 
 
 def run_txt2img(
@@ -48,7 +185,7 @@ def run_txt2img(
 
     - Uses get_txt2img_pipeline(...) from pipeline_manager.py
     - If the underlying pipeline returns a real PIL image (SD3.5),
-      we save it to Backend/outputs/ as a PNG.
+      we save it to Backend/outputs/ (PNG unless RENDEREXPO_OUTPUT_FORMAT says otherwise).
     - If it's a dummy pipeline (e.g. SDXL in placeholder mode), we
       DO NOT write an image, but still return a reserved output path.
 
@@ -62,25 +199,12 @@ def run_txt2img(
     )
 
     # Fill in defaults from config if values are not provided.
-    cfg_scale = cfg_scale or app_config.txt2img_default_cfg_scale
-    num_inference_steps = (
-        num_inference_steps or app_config.txt2img_default_inference_steps
+    cfg_scale, num_inference_steps, width, height = _apply_defaults(
+        cfg_scale, num_inference_steps, width, height
     )
-    width = width or app_config.txt2img_default_width
-    height = height or app_config.txt2img_default_height
-
-    outputs_dir = _ensure_outputs_dir()
-    filename = generate_output_filename(prefix="txt2img", ext="png")
-    output_path = outputs_dir / filename
+    output_path = _reserve_output_path()
 
-    # Get (or lazily create) the pipeline instance.
-    pipeline = get_txt2img_pipeline(model_id=model_id)
-
-    # Run the pipeline.
-    # For SD3.5, this should return a dict with "pil_image".
-    # For dummy pipelines, it returns metadata only.
-    pipeline_result = pipeline.run(
-        prompt=prompt,
+    run_kwargs: Dict[str, Any] = dict(
         negative_prompt=negative_prompt,
         width=width,
         height=height,
@@ -90,20 +214,96 @@ def run_txt2img(
         **extra,
     )
 
+    cache = get_approx_cache()
+    params_key = _approx_params_key(
+        model_id, negative_prompt, width, height, cfg_scale, num_inference_steps, seed
+    )
+    pipeline_result = None
+    if cache is not None:
+        pipeline_result = _approx_generate(
+            cache, prompt, params_key, model_id, run_kwargs, output_path
+        )
+
+    if pipeline_result is None:
+        # Get (or lazily create) the pipeline instance.
+        pipeline = get_txt2img_pipeline(model_id=model_id)
+
+        # Run the pipeline.
+        # For SD3.5, this should return a dict with "pil_image".
+        # For dummy pipelines, it returns metadata only.
+        pipeline_result = pipeline.run(prompt=prompt, **run_kwargs)
+
+    return _finish_txt2img(
+        pipeline_result,
+        output_path,
+        cache=cache,
+        params_key=params_key,
+        prompt=prompt,
+        negative_prompt=negative_prompt,
+        model_id=model_id,
+        width=width,
+        height=height,
+        cfg_scale=cfg_scale,
+        num_inference_steps=num_inference_steps,
+    )
+
+
+def _apply_defaults(
+    cfg_scale: Optional[float],
+    num_inference_steps: Optional[int],
+    width: Optional[int],
+    height: Optional[int],
+) -> Tuple[float, int, int, int]:
+    return (
+        cfg_scale or app_config.txt2img_default_cfg_scale,
+        num_inference_steps or app_config.txt2img_default_inference_steps,
+        width or app_config.txt2img_default_width,
+        height or app_config.txt2img_default_height,
+    )
+
+
+def _reserve_output_path() -> Path:
+    filename = generate_output_filename(prefix="txt2img", ext=output_image_ext())
+    return _ensure_outputs_dir() / filename
+
+
+def _finish_txt2img(
+    pipeline_result: Dict[str, Any],
+    output_path: Path,
+    *,
+    cache: Optional[ApproxImageCache],
+    params_key: Tuple[Any, ...],
+    prompt: str,
+    negative_prompt: Optional[str],
+    model_id: str,
+    width: int,
+    height: int,
+    cfg_scale: float,
+    num_inference_steps: int,
+) -> Dict[str, Any]:
+    """
+    Queue the image save (if any) and build the JSON-safe response.
+    Saved real images are added to the approximate cache when it is on.
+    """
     real_image = False
 
     # If the pipeline produced a PIL image (real SD3.5), save it.
+    # The image is encoded in the background; output_image_path is reserved now
+    # and the file appears once the save finishes.
+    cached_path = pipeline_result.pop("cached_path", None)
     pil_image = pipeline_result.get("pil_image")
-    if pil_image is not None:
-        try:
-            pil_image.save(output_path, format="PNG")
-            real_image = True
-            logger.info(
-                "TXT2IMG: Saved real SD3.5 image to: %s",
-                output_path,
+    if cached_path is not None:
+        # Approximate-cache hit: _approx_generate already put the earlier
+        # file's bytes at output_path.
+        real_image = True
+    elif pil_image is not None:
+        future = _SAVE_POOL.submit(save_output_image, pil_image, output_path)
+        future.add_done_callback(lambda f: _log_save_result(output_path, f))
+        if cache is not None:
+            future.add_done_callback(
+                lambda f: _add_to_cache(cache, prompt, params_key, output_path, f)
             )
-        except Exception as e:  # noqa: BLE001
-            logger.exception("Failed to save SD3.5 image to %s: %s", output_path, e)
+        real_image = True
     else:
         # Dummy pipeline case: no real image, just reserve the path.
         logger.info(
@@ -119,8 +319,9 @@ def run_txt2img(
         "model_id": pipeline_result.get("model_id", model_id),
         "prompt": prompt,
         "negative_prompt": negative_prompt,
-        "width": width,
-        "height": height,
+        # SD3.5 rounds sizes to a multiple of 16; report what was rendered.
+        "width": pipeline_result.get("width", width),
+        "height": pipeline_result.get("height", height),
         "cfg_scale": cfg_scale,
         "num_inference_steps": num_inference_steps,
         "output_image_path": str(output_path),
@@ -136,6 +337,96 @@ def run_txt2img(
     return response
 
 
+# One micro-batcher per real SD3.5 wrapper (wrappers are process-wide) and
+# event loop: a BatchingExecutor's queue and worker task belong to the loop
+# that first used it. Entries go away with their loop.
+_BATCHERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, BatchingExecutor]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _batcher_for(wrapper: SD35Txt2ImgPipelineWrapper) -> BatchingExecutor:
+    per_loop = _BATCHERS.setdefault(asyncio.get_running_loop(), {})
+    batcher = per_loop.get(id(wrapper))
+    if batcher is None:
+        batcher = per_loop[id(wrapper)] = BatchingExecutor(wrapper)
+    return batcher
+
+
+async def run_txt2img_async(
+    prompt: str,
+    negative_prompt: Optional[str] = None,
+    cfg_scale: Optional[float] = None,
+    num_inference_steps: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    model_id: str = "sd3.5-large",
+    seed: Optional[int] = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """
+    Awaitable run_txt2img for async FastAPI handlers; same arguments and
+    response.
+
+    With a real SD3.5 pipeline, concurrent requests that share generation
+    params are coalesced by BatchingExecutor into one batched forward pass
+    (each caller still gets its own image). Other pipelines run in a worker
+    thread. Either way the event loop is never blocked, and the image
+    encode stays on _SAVE_POOL.
+    """
+    logger.info(
+        "TXT2IMG (async) request received: prompt=%r, model_id=%s",
+        prompt,
+        model_id,
+    )
+
+    cfg_scale, num_inference_steps, width, height = _apply_defaults(
+        cfg_scale, num_inference_steps, width, height
+    )
+    output_path = _reserve_output_path()
+
+    params: Dict[str, Any] = dict(
+        negative_prompt=negative_prompt,
+        width=width,
+        height=height,
+        num_inference_steps=num_inference_steps,
+        guidance_scale=cfg_scale,
+        seed=seed,
+        **extra,
+    )
+
+    cache = get_approx_cache()
+    params_key = _approx_params_key(
+        model_id, negative_prompt, width, height, cfg_scale, num_inference_steps, seed
+    )
+    pipeline_result = None
+    if cache is not None:
+        pipeline_result = await asyncio.to_thread(
+            _approx_generate, cache, prompt, params_key, model_id, params, output_path
+        )
+
+    if pipeline_result is None:
+        pipeline = await asyncio.to_thread(get_txt2img_pipeline, model_id=model_id)
+        if isinstance(pipeline, SD35Txt2ImgPipelineWrapper):
+            pipeline_result = await _batcher_for(pipeline).submit(prompt, **params)
+        else:
+            pipeline_result = await asyncio.to_thread(pipeline.run, prompt=prompt, **params)
+
+    return _finish_txt2img(
+        pipeline_result,
+        output_path,
+        cache=cache,
+        params_key=params_key,
+        prompt=prompt,
+        negative_prompt=negative_prompt,
+        model_id=model_id,
+        width=width,
+        height=height,
+        cfg_scale=cfg_scale,
+        num_inference_steps=num_inference_steps,
+    )
+
+
 # -------------------------------------------------------------------
 # Backwards-compatible aliases
 # -------------------------------------------------------------------
@@ -159,6 +450,7 @@ def generate(*, prompt: str, **kwargs: Any) -> Dict[str, Any]:
 
 __all__ = [
     "run_txt2img",
+    "run_txt2img_async",
     "txt2img",
     "generate",
 ]
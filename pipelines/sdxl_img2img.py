@@ -10,13 +10,15 @@ except ImportError:
     def get_logger(name: str):
         return logging.getLogger(name)
 
-from config import app_config  # type: ignore
-from file_utils import generate_output_filename, validate_image_file  # type: ignore
+from file_utils import ensure_output_dir  # type: ignore
 
-from .pipeline_manager import get_img2img_pipeline
+from ._img2img_base import _open_rgb, run_img2img_common
 from .sdxl_pipelines import SDXLImg2ImgPipelineWrapper  # type: ignore
 
-from PIL import Image
+try:
+    from torchvision.io import ImageReadMode, read_image  # type: ignore
+except ImportError:  # pragma: no cover - torchvision is optional here
+    read_image = None  # type: ignore
 
 logger = get_logger(__name__)
 
@@ -26,8 +28,33 @@ OUTPUTS_DIR = BACKEND_ROOT / "outputs"
 
 
 def _ensure_outputs_dir() -> Path:
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-    return OUTPUTS_DIR
+    return ensure_output_dir(OUTPUTS_DIR)
+
+
+def _load_init_image(path: Path, pipeline: SDXLImg2ImgPipelineWrapper) -> Any:
+    """
+    Load the init image for the SDXL pipeline.
+
+    On CUDA, decode with torchvision (libjpeg-turbo/libpng, GIL released)
+    straight into a uint8 tensor, then upload it through pinned memory with
+    a non-blocking copy and normalize to [0, 1] in place on the GPU. This
+    skips the PIL -> numpy -> tensor chain inside diffusers.
+
+    Falls back to a PIL image on CPU/MPS, or if torchvision cannot decode
+    the file.
+    """
+    device = pipeline.device
+    if read_image is None or getattr(device, "type", None) != "cuda":
+        return _open_rgb(path)
+
+    try:
+        tensor = read_image(str(path), mode=ImageReadMode.RGB, apply_exif_orientation=True)
+    except (TypeError, RuntimeError) as e:  # old torchvision / unsupported format
+        logger.info("torchvision decode unavailable for %s (%s); using PIL.", path, e)
+        return _open_rgb(path)
+
+    tensor = tensor.pin_memory().to(device, non_blocking=True)
+    return tensor.unsqueeze_(0).float().div_(255.0)
 
 
 def run_img2img(
@@ -45,107 +72,25 @@ def run_img2img(
     """
     High-level IMG2IMG entry point for FastAPI.
 
-    Behavior:
-      - Validates the input image file.
-      - Loads REAL SDXL pipeline when available.
-      - Saves PIL output image if real, or dummy metadata if not.
+    SDXL adapter over run_img2img_common(...): on CUDA the real pipeline
+    gets the init image as a device tensor (see _load_init_image).
     """
-    init_image_path = Path(init_image_path)
-    logger.info(
-        "IMG2IMG request: prompt=%r, model_id=%s, init_image=%s",
+    return run_img2img_common(
         prompt,
-        model_id,
         init_image_path,
+        SDXLImg2ImgPipelineWrapper,
+        model_id=model_id,
+        outputs_dir=_ensure_outputs_dir(),
+        prepare_init_image=_load_init_image,
+        negative_prompt=negative_prompt,
+        strength=strength,
+        cfg_scale=cfg_scale,
+        num_inference_steps=num_inference_steps,
+        width=width,
+        height=height,
+        **extra,
     )
 
-    validate_image_file(init_image_path)
-
-    # defaults
-    strength = strength if strength is not None else app_config.img2img_default_strength
-    cfg_scale = cfg_scale or app_config.img2img_default_cfg_scale
-    num_inference_steps = num_inference_steps or app_config.img2img_default_inference_steps
-    width = width or app_config.img2img_default_width
-    height = height or app_config.img2img_default_height
-
-    outputs_dir = _ensure_outputs_dir()
-    filename = generate_output_filename(prefix="img2img", ext="png")
-    output_path = outputs_dir / filename
-
-    pipeline = get_img2img_pipeline(model_id=model_id)
-
-    init_image_info = {"path": str(init_image_path)}
-
-    # REAL SDXL PIPELINE
-    if isinstance(pipeline, SDXLImg2ImgPipelineWrapper):
-        logger.info("Using REAL SDXL IMG2IMG pipeline.")
-        init_image = Image.open(init_image_path).convert("RGB")
-
-        pipeline_result = pipeline.run(
-            prompt=prompt,
-            init_image=init_image,
-            negative_prompt=negative_prompt,
-            strength=strength,
-            num_inference_steps=num_inference_steps,
-            guidance_scale=cfg_scale,
-            width=width,
-            height=height,
-            **extra,
-        )
-
-    # DUMMY PIPELINE
-    else:
-        logger.info("Using DUMMY IMG2IMG pipeline (no real generation).")
-        pipeline_result = pipeline.run(
-            prompt=prompt,
-            init_image_info=init_image_info,
-            negative_prompt=negative_prompt,
-            strength=strength,
-            cfg_scale=cfg_scale,
-            num_inference_steps=num_inference_steps,
-            width=width,
-            height=height,
-            **extra,
-        )
-
-    # Handle PIL output
-    pil_image = pipeline_result.pop("pil_image", None)
-
-    if pil_image is not None:
-        try:
-            pil_image.save(output_path)
-            logger.info("Saved REAL IMG2IMG image to %s", output_path)
-        except Exception as e:
-            logger.error(
-                "Failed to save REAL IMG2IMG image to %s. Error: %s",
-                output_path,
-                e,
-            )
-    else:
-        logger.info(
-            "IMG2IMG dummy mode. No real output generated. Reserved path: %s",
-            output_path,
-        )
-
-    response: Dict[str, Any] = {
-        "status": "ok",
-        "type": "img2img",
-        "engine": pipeline_result.get("model_name"),
-        "model_id": pipeline_result.get("model_id"),
-        "prompt": prompt,
-        "negative_prompt": negative_prompt,
-        "init_image_path": str(init_image_path),
-        "width": width,
-        "height": height,
-        "strength": strength,
-        "cfg_scale": cfg_scale,
-        "num_inference_steps": num_inference_steps,
-        "output_image_path": str(output_path),
-        "params": pipeline_result.get("params", {}),
-        "debug": pipeline_result,
-    }
-
-    return response
-
 
 # -------------------------------------------------------------------
 # API aliases
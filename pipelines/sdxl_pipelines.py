@@ -1,7 +1,16 @@
 # Backend/pipelines/sdxl_pipelines.py
 
+import copy
+import functools
 import os
-from typing import Any, Dict, Optional
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 try:
     from logs.log_utils import get_logger  # type: ignore
@@ -15,9 +24,26 @@ except ImportError:
 
 import torch  # type: ignore
 from diffusers import (  # type: ignore
+    AutoencoderTiny,
     StableDiffusionXLPipeline,
     StableDiffusionXLImg2ImgPipeline,
 )
+from diffusers.models.attention_processor import AttnProcessor2_0  # type: ignore
+
+try:
+    import torch_tensorrt  # type: ignore
+except ImportError:  # pragma: no cover - TensorRT is optional
+    torch_tensorrt = None  # type: ignore
+
+try:
+    import intel_extension_for_pytorch as ipex  # type: ignore
+except ImportError:  # pragma: no cover - IPEX is optional (CPU only)
+    ipex = None  # type: ignore
+
+try:
+    from DeepCache import DeepCacheSDHelper  # type: ignore
+except ImportError:  # pragma: no cover - DeepCache is optional
+    DeepCacheSDHelper = None  # type: ignore
 
 logger = get_logger(__name__)
 
@@ -25,11 +51,14 @@ logger = get_logger(__name__)
 # Device / model helpers
 # -------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=1)
 def _resolve_device() -> torch.device:
     """
     Decide where SDXL runs: CPU now, GPU later.
     Uses env var RENDEREXPO_DEVICE: "cpu" | "cuda" | "mps".
     Default is "cpu" for safety/cost.
+
+    Resolved once per process; call reset_device_cache() to re-read it.
     """
     env_val = os.environ.get("RENDEREXPO_DEVICE", "cpu").lower()
 
@@ -44,6 +73,314 @@ def _resolve_device() -> torch.device:
     return torch.device("cpu")
 
 
+def reset_device_cache() -> None:
+    """
+    Forget the memoized device so the next _resolve_device() re-reads
+    RENDEREXPO_DEVICE (useful in tests).
+    """
+    _resolve_device.cache_clear()
+    _cpu_has_bf16.cache_clear()
+
+
+@functools.lru_cache(maxsize=1)
+def _cpu_has_bf16() -> bool:
+    """
+    True when the CPU has native bf16 matmul (AMX-BF16 on Sapphire Rapids,
+    AVX512-BF16 on Zen4 / Cooper Lake). Set RENDEREXPO_CPU_BF16=0 to keep
+    float32 on CPU regardless.
+    """
+    if os.environ.get("RENDEREXPO_CPU_BF16", "1") == "0":
+        return False
+
+    cpu = getattr(torch, "cpu", None)
+    for probe in ("_is_amx_tile_supported", "_is_avx512_bf16_supported"):
+        fn = getattr(cpu, probe, None)
+        if fn is not None and fn():
+            return True
+
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "amx_bf16" in flags or "avx512_bf16" in flags
+
+
+def _resolve_dtype(device: torch.device) -> torch.dtype:
+    """
+    fp16 on CUDA/MPS; on CPU bf16 when the hardware supports it, else fp32.
+    """
+    if device.type in ("cuda", "mps"):
+        return torch.float16
+    if _cpu_has_bf16():
+        return torch.bfloat16
+    return torch.float32
+
+
+def _optimize_for_cpu_bf16(pipe: Any, device: torch.device, dtype: torch.dtype) -> None:
+    """
+    CPU bf16 path: allow reduced-precision fp32 matmuls for the remaining
+    fp32 ops and, if intel_extension_for_pytorch is installed, let IPEX
+    repack the UNet weights for the AMX / AVX512-BF16 kernels.
+    """
+    if device.type != "cpu" or dtype != torch.bfloat16:
+        return
+
+    torch.set_float32_matmul_precision("medium")
+    if ipex is None:
+        logger.info("CPU bf16 enabled for SDXL (IPEX not installed; stock kernels).")
+        return
+
+    logger.info("CPU bf16 enabled for SDXL; optimizing UNet with IPEX.")
+    pipe.unet = ipex.optimize(pipe.unet.eval(), dtype=torch.bfloat16, inplace=True)
+
+
+# Set RENDEREXPO_TINY_VAE=1 to decode with TAESD-XL instead of the full VAE.
+_TINY_VAE_ENABLED = os.environ.get("RENDEREXPO_TINY_VAE") == "1"
+_TINY_VAE_REPO = "madebyollin/taesdxl"
+
+
+def _maybe_swap_tiny_vae(pipe: Any, dtype: torch.dtype) -> None:
+    """
+    Replace the ~80M-param SDXL VAE with the ~1M-param TAESD-XL autoencoder.
+    Decode drops from hundreds of ms to tens of ms at some cost in fine detail.
+    """
+    if not _TINY_VAE_ENABLED:
+        return
+
+    logger.info("Using tiny autoencoder %s for SDXL.", _TINY_VAE_REPO)
+    pipe.vae = AutoencoderTiny.from_pretrained(_TINY_VAE_REPO, torch_dtype=dtype)
+
+
+# Set RENDEREXPO_TRT=1 to build (or load) a TensorRT engine for the UNet.
+_TRT_ENABLED = os.environ.get("RENDEREXPO_TRT") == "1"
+_TRT_CACHE_DIR = Path("/app/cache/trt")
+
+# The TRT engine accepts any output size whose sides fall in this range;
+# TensorRT tunes its kernels for the txt2img wrapper's default 1024x768.
+_TRT_MIN_SIDE = 512
+_TRT_MAX_SIDE = 1536
+_TRT_OPT_WIDTH = 1024
+_TRT_OPT_HEIGHT = 768
+# Classifier-free guidance: one uncond + one cond latent per image.
+_TRT_BATCH = 2
+
+
+def _trt_example_inputs(pipe: Any, device: torch.device) -> Tuple[tuple, Dict[str, Any]]:
+    """
+    Example UNet inputs at the TRT opt resolution with classifier-free
+    guidance (batch of 2), matching what the SDXL pipelines pass per step.
+    """
+    dtype = pipe.unet.dtype
+    latent_h = _TRT_OPT_HEIGHT // pipe.vae_scale_factor
+    latent_w = _TRT_OPT_WIDTH // pipe.vae_scale_factor
+
+    sample = torch.randn(
+        _TRT_BATCH, pipe.unet.config.in_channels, latent_h, latent_w, device=device, dtype=dtype
+    )
+    timestep = torch.tensor([999.0] * _TRT_BATCH, device=device, dtype=dtype)
+    encoder_hidden_states = torch.randn(
+        _TRT_BATCH, 77, pipe.unet.config.cross_attention_dim, device=device, dtype=dtype
+    )
+    added_cond_kwargs = {
+        "text_embeds": torch.randn(
+            _TRT_BATCH, pipe.text_encoder_2.config.projection_dim, device=device, dtype=dtype
+        ),
+        "time_ids": torch.randn(_TRT_BATCH, 6, device=device, dtype=dtype),
+    }
+    return (sample, timestep, encoder_hidden_states), {
+        "added_cond_kwargs": added_cond_kwargs,
+        "return_dict": False,
+    }
+
+
+def _trt_sample_input(pipe: Any, sample: torch.Tensor) -> Any:
+    """
+    Dynamic-shape profile for the latent input: height and width may be
+    anything between _TRT_MIN_SIDE and _TRT_MAX_SIDE pixels; batch and
+    channels stay fixed.
+    """
+    factor = pipe.vae_scale_factor
+    batch, channels = sample.shape[:2]
+    lo = _TRT_MIN_SIDE // factor
+    hi = _TRT_MAX_SIDE // factor
+    return torch_tensorrt.Input(
+        min_shape=(batch, channels, lo, lo),
+        opt_shape=tuple(sample.shape),
+        max_shape=(batch, channels, hi, hi),
+        dtype=sample.dtype,
+    )
+
+
+def _install_trt_forward(unet: Any, engine: Any, vae_scale_factor: int) -> None:
+    """
+    Route UNet calls the engine's profile covers (batch of 2, latent sides
+    within the TRT size range, return_dict=False, no extra conditioning) to
+    the TRT engine and everything else to the eager forward, logging each
+    uncovered input shape once. The UNet module itself stays in place, so
+    .config / .dtype keep working.
+    """
+    eager_forward = unet.forward
+    lo = _TRT_MIN_SIDE // vae_scale_factor
+    hi = _TRT_MAX_SIDE // vae_scale_factor
+    channels = unet.config.in_channels
+    logged_shapes = set()
+
+    def forward(sample, timestep, encoder_hidden_states, *args, **kwargs):
+        batch, sample_channels, latent_h, latent_w = sample.shape
+        use_engine = (
+            batch == _TRT_BATCH
+            and sample_channels == channels
+            and lo <= latent_h <= hi
+            and lo <= latent_w <= hi
+            and not args
+            and kwargs.get("return_dict", True) is False
+            and all(
+                value is None
+                for key, value in kwargs.items()
+                if key not in ("added_cond_kwargs", "return_dict")
+            )
+        )
+        if not use_engine:
+            if tuple(sample.shape) not in logged_shapes:
+                logged_shapes.add(tuple(sample.shape))
+                logger.info(
+                    "TensorRT UNet engine does not cover this call (sample %s); "
+                    "using the eager UNet.",
+                    tuple(sample.shape),
+                )
+            return eager_forward(sample, timestep, encoder_hidden_states, *args, **kwargs)
+
+        if timestep.dim() == 0:
+            timestep = timestep.expand(batch)
+        return engine(
+            sample,
+            timestep.to(sample.dtype),
+            encoder_hidden_states,
+            added_cond_kwargs=kwargs["added_cond_kwargs"],
+            return_dict=False,
+        )
+
+    unet.forward = forward
+
+
+def _maybe_compile_trt(pipe: Any, device: torch.device, repo_id: str) -> bool:
+    """
+    Build or load a TensorRT engine for the UNet with a dynamic height/width
+    profile (see _trt_sample_input).
+
+    Engines are cached under /app/cache/trt/<repo>_<gpu>_<min>-<max>px.ep so
+    later cold starts only deserialize. Returns False (after logging) when
+    torch_tensorrt is unavailable or the build fails.
+    """
+    if torch_tensorrt is None:
+        logger.warning("RENDEREXPO_TRT=1 but torch_tensorrt is not installed.")
+        return False
+
+    args, kwargs = _trt_example_inputs(pipe, device)
+    gpu_name = torch.cuda.get_device_name(device).replace(" ", "-")
+    cache_path = _TRT_CACHE_DIR / (
+        f"{repo_id.replace('/', '--')}_{gpu_name}_{_TRT_MIN_SIDE}-{_TRT_MAX_SIDE}px.ep"
+    )
+
+    try:
+        if cache_path.is_file():
+            logger.info("Loading cached TensorRT UNet engine from %s", cache_path)
+            engine = torch_tensorrt.load(str(cache_path)).module()
+        else:
+            logger.info("Building TensorRT UNet engine (this takes a while)...")
+            engine = torch_tensorrt.compile(
+                pipe.unet,
+                ir="dynamo",
+                arg_inputs=[_trt_sample_input(pipe, args[0]), *args[1:]],
+                kwarg_inputs=kwargs,
+                enabled_precisions={pipe.unet.dtype},
+            )
+            _TRT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            torch_tensorrt.save(
+                engine, str(cache_path), arg_inputs=list(args), kwarg_inputs=kwargs
+            )
+            logger.info("Saved TensorRT UNet engine to %s", cache_path)
+    except Exception as e:  # noqa: BLE001 - fall back to torch.compile
+        logger.warning("TensorRT UNet build/load failed: %s", e)
+        return False
+
+    _install_trt_forward(pipe.unet, engine, pipe.vae_scale_factor)
+    return True
+
+
+# Set RENDEREXPO_DEEPCACHE=1 to reuse cached UNet high-level features
+# between denoise steps (DeepCache); RENDEREXPO_DEEPCACHE_INTERVAL sets K.
+_DEEPCACHE_ENABLED = (
+    os.environ.get("RENDEREXPO_DEEPCACHE") == "1" and DeepCacheSDHelper is not None
+)
+_DEEPCACHE_INTERVAL = int(os.environ.get("RENDEREXPO_DEEPCACHE_INTERVAL", "3"))
+
+if os.environ.get("RENDEREXPO_DEEPCACHE") == "1" and DeepCacheSDHelper is None:
+    logger.warning("RENDEREXPO_DEEPCACHE=1 but DeepCache is not installed.")
+
+
+def _enable_attention_and_vae(pipe: Any, device: torch.device) -> None:
+    """
+    Memory-efficient attention and VAE decode options on CUDA.
+
+    The UNet gets fused SDPA attention (AttnProcessor2_0) whenever it is
+    compiled (torch.compile / TRT trace SDPA cleanly); xFormers is only used
+    when the UNet stays eager (DeepCache) and falls back to SDPA if missing.
+    VAE slicing decodes a batch one image at a time and tiling caps decode
+    VRAM above 1024².
+    """
+    if device.type != "cuda":
+        return
+
+    if _DEEPCACHE_ENABLED:
+        try:
+            pipe.enable_xformers_memory_efficient_attention()
+        except Exception:  # noqa: BLE001 - xformers missing/unsupported -> SDPA
+            logger.info("xFormers not available – using PyTorch SDPA attention.")
+            pipe.unet.set_attn_processor(AttnProcessor2_0())
+    else:
+        pipe.unet.set_attn_processor(AttnProcessor2_0())
+
+    pipe.vae.enable_slicing()
+    pipe.vae.enable_tiling()
+
+
+def _optimize_for_cuda(pipe: Any, device: torch.device, repo_id: str) -> None:
+    """
+    CUDA-only layout/compile tweaks applied once after .to(device):
+      - channels_last for the conv-heavy UNet and VAE (cuDNN's fastest
+        NHWC kernels)
+      - RENDEREXPO_TRT=1: TensorRT engine for the UNet, falling back to
+        torch.compile(mode="max-autotune-no-cudagraphs") if TRT is unavailable
+      - otherwise torch.compile of the UNet forward (default mode)
+
+    No CUDA graphs: the UNet is shared by both wrappers and called from any
+    request thread and from SDXLStepBatchScheduler's denoise thread, whose
+    batch size changes with the step mix. cudagraph trees keep a graph
+    pool per thread and record a graph per new shape, which can exhaust
+    VRAM.
+
+    DeepCache patches the UNet blocks at run time, so with it enabled the
+    UNet stays eager (no TRT / torch.compile).
+    """
+    if device.type != "cuda":
+        return
+
+    pipe.unet.to(memory_format=torch.channels_last)
+    pipe.vae.to(memory_format=torch.channels_last)
+
+    if _DEEPCACHE_ENABLED:
+        return
+
+    if _TRT_ENABLED:
+        if not _maybe_compile_trt(pipe, device, repo_id):
+            pipe.unet = torch.compile(pipe.unet, mode="max-autotune-no-cudagraphs", fullgraph=False)
+        return
+
+    pipe.unet = torch.compile(pipe.unet, fullgraph=False)
+
+
 # Map our logical model IDs to Hugging Face repos.
 _MODEL_ID_MAP: Dict[str, str] = {
     "sdxl-base": "stabilityai/stable-diffusion-xl-base-1.0",
@@ -60,6 +397,437 @@ def _resolve_repo_id(model_id: str) -> str:
     return _MODEL_ID_MAP.get(model_id, model_id)
 
 
+# lru_cache alone lets concurrent first calls (both wrappers built at once)
+# each run the load, so misses are serialized under this lock.
+_COMPONENTS_LOCK = threading.Lock()
+
+
+def _load_components(repo_id: str, dtype_str: str, device_str: str) -> Dict[str, Any]:
+    """
+    Load SDXL weights once per (repo_id, dtype, device) and return the
+    pipeline components (unet, vae, text encoders, tokenizers, scheduler).
+
+    Both wrappers build their pipeline from these, so txt2img and img2img
+    share one copy of the weights. Device placement, the optional tiny VAE
+    and the CUDA / CPU-bf16 optimizations are applied here, once.
+    """
+    with _COMPONENTS_LOCK:
+        return _load_components_cached(repo_id, dtype_str, device_str)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_components_cached(repo_id: str, dtype_str: str, device_str: str) -> Dict[str, Any]:
+    dtype = getattr(torch, dtype_str)
+    device = torch.device(device_str)
+
+    pipe = StableDiffusionXLPipeline.from_pretrained(
+        repo_id,
+        torch_dtype=dtype,
+        use_safetensors=True,
+    )
+    _maybe_swap_tiny_vae(pipe, dtype)
+    pipe.to(device)
+    _enable_attention_and_vae(pipe, device)
+    _optimize_for_cuda(pipe, device, repo_id)
+    _optimize_for_cpu_bf16(pipe, device, dtype)
+    return pipe.components
+
+
+def _pipeline_components(repo_id: str, dtype: torch.dtype, device: torch.device) -> Dict[str, Any]:
+    """
+    Shared components plus a private scheduler (schedulers keep per-run state).
+
+    An fp16 VAE with force_upcast is private too: diffusers casts pipe.vae to
+    fp32 in place for the decode (txt2img) / encode (img2img) and back to
+    fp16 afterwards, so a shared one would flip dtype under a concurrent call
+    on the other wrapper. The copy stays fp16 so diffusers' own upcast path
+    still lines the latents up with it.
+    """
+    components = dict(_load_components(repo_id, str(dtype).split(".")[-1], str(device)))
+    scheduler = components["scheduler"]
+    components["scheduler"] = scheduler.__class__.from_config(scheduler.config)
+    vae = components["vae"]
+    if vae.dtype == torch.float16 and getattr(vae.config, "force_upcast", False):
+        components["vae"] = copy.deepcopy(vae)
+    return components
+
+
+# -------------------------------------------------------------------
+# DeepCache
+# -------------------------------------------------------------------
+# txt2img and img2img share one UNet, and DeepCache both patches it and
+# reads the timestep index from one pipeline's scheduler. So each wrapper
+# enables its helper only around its own pipe(...) call, under a lock that
+# also covers direct UNet calls from SDXLStepBatchScheduler.
+# -------------------------------------------------------------------
+
+_UNET_PATCH_LOCK = threading.Lock()
+_NO_GUARD = nullcontext()
+
+
+def _make_deepcache_helper(pipe: Any) -> Optional[Any]:
+    """
+    DeepCache helper for this pipeline (cache_interval=K, cache_branch_id=0),
+    or None when RENDEREXPO_DEEPCACHE is off / DeepCache is missing.
+    """
+    if not _DEEPCACHE_ENABLED:
+        return None
+
+    helper = DeepCacheSDHelper(pipe=pipe)
+    helper.set_params(cache_interval=_DEEPCACHE_INTERVAL, cache_branch_id=0)
+    logger.info("DeepCache enabled for SDXL (cache_interval=%d).", _DEEPCACHE_INTERVAL)
+    return helper
+
+
+@contextmanager
+def _deepcache(helper: Optional[Any]) -> Iterator[None]:
+    """
+    Run the enclosed pipe(...) call with DeepCache patched into the shared UNet.
+    """
+    if helper is None:
+        yield
+        return
+
+    with _UNET_PATCH_LOCK:
+        helper.enable()
+        try:
+            yield
+        finally:
+            helper.disable()
+
+
+# -------------------------------------------------------------------
+# Prompt embedding cache
+# -------------------------------------------------------------------
+
+class _PromptEmbedCache:
+    """
+    Bounded LRU of SDXL prompt embeddings keyed by (prompt, negative_prompt).
+
+    Repeated / templated prompts (batch jobs, style presets) skip the two
+    CLIP text-encoder forwards. Embeddings are always computed with
+    classifier-free guidance so one entry serves any guidance_scale.
+    """
+
+    def __init__(self, pipe: Any, device: torch.device, max_entries: int = 128):
+        self.pipe = pipe
+        self.device = device
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, torch.Tensor]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @torch.inference_mode()
+    def get(self, prompt: str, negative_prompt: Optional[str]) -> Dict[str, torch.Tensor]:
+        """
+        Return the pipeline kwargs prompt_embeds, negative_prompt_embeds,
+        pooled_prompt_embeds and negative_pooled_prompt_embeds.
+        """
+        key = (prompt, negative_prompt or "")
+        with self._lock:
+            embeds = self._entries.get(key)
+            if embeds is not None:
+                self._entries.move_to_end(key)
+                return embeds
+
+        prompt_embeds, negative_embeds, pooled, negative_pooled = self.pipe.encode_prompt(
+            prompt=prompt,
+            device=self.device,
+            num_images_per_prompt=1,
+            do_classifier_free_guidance=True,
+            negative_prompt=negative_prompt,
+        )
+        embeds = {
+            "prompt_embeds": prompt_embeds,
+            "negative_prompt_embeds": negative_embeds,
+            "pooled_prompt_embeds": pooled,
+            "negative_pooled_prompt_embeds": negative_pooled,
+        }
+
+        with self._lock:
+            self._entries[key] = embeds
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return embeds
+
+
+# Initial-latent buffers per thread, keyed by (shape, dtype, device). A thread
+# runs one request at a time and pipe(...) / SDXLStepBatchScheduler scale the
+# latents into a new tensor before denoising, so refilling the buffer for the
+# next request cannot touch one still in flight.
+_LATENT_LOCAL = threading.local()
+
+
+def _initial_latents(
+    pipe: Any,
+    width: int,
+    height: int,
+    dtype: torch.dtype,
+    device: torch.device,
+    seed: Optional[int] = None,
+) -> torch.Tensor:
+    """
+    N(0, 1) initial latents, refilled in this thread's pooled buffer.
+
+    Seeded requests draw from a CPU generator (as the SD3.5 wrappers do), so
+    a seed gives the same image on any GPU and is unaffected by other
+    requests running on the device; the noise is then copied over.
+    """
+    shape = (1, pipe.unet.config.in_channels, height // pipe.vae_scale_factor, width // pipe.vae_scale_factor)
+    pool: Optional[Dict[Tuple[Any, ...], torch.Tensor]] = getattr(_LATENT_LOCAL, "pool", None)
+    if pool is None:
+        pool = _LATENT_LOCAL.pool = {}
+
+    key = (shape, dtype, str(device))
+    buf = pool.get(key)
+    if buf is None:
+        buf = pool[key] = torch.empty(shape, dtype=dtype, device=device)
+
+    if seed is None:
+        return torch.randn(shape, dtype=dtype, device=device, out=buf)
+    generator = torch.Generator().manual_seed(int(seed))
+    return buf.copy_(torch.randn(shape, generator=generator, dtype=torch.float32))
+
+
+# -------------------------------------------------------------------
+# Step-level continuous batching (txt2img)
+# -------------------------------------------------------------------
+# Set RENDEREXPO_SDXL_STEP_BATCHING=1 to route SDXL txt2img requests through
+# SDXLStepBatchScheduler instead of one self.pipe(...) call per request.
+# -------------------------------------------------------------------
+
+_STEP_BATCHING_ENABLED = os.environ.get("RENDEREXPO_SDXL_STEP_BATCHING") == "1"
+
+
+@dataclass
+class _DenoiseRequest:
+    """
+    Per-request state for SDXLStepBatchScheduler.
+
+    prompt_embeds / text_embeds / time_ids hold 2 rows (uncond, cond) when
+    classifier-free guidance is on, 1 row otherwise.
+    """
+
+    latents: torch.Tensor
+    scheduler: Any
+    prompt_embeds: torch.Tensor
+    text_embeds: torch.Tensor
+    time_ids: torch.Tensor
+    guidance_scale: float
+    step_idx: int = 0
+    future: Future = field(default_factory=Future)
+
+    @property
+    def done(self) -> bool:
+        return self.step_idx >= len(self.scheduler.timesteps)
+
+
+class SDXLStepBatchScheduler:
+    """
+    Step-level continuous batching for SDXL txt2img.
+
+    run() callers submit requests; a single denoise thread advances every
+    in-flight request by one step per UNet forward, batching all requests
+    with the same latent shape even when they are at different timesteps.
+    New requests join between steps and finished ones leave right away.
+    VAE decode runs on its own thread so it never stalls the UNet loop.
+
+    With a steady stream of prompts this is StreamDiffusion's "Stream
+    Batch": each forward advances several requests that sit at different
+    points of their schedules, so throughput scales with batch size rather
+    than with the number of steps.
+    """
+
+    def __init__(
+        self,
+        pipe: StableDiffusionXLPipeline,
+        device: torch.device,
+        max_batch: int = 4,
+        embed_cache: Optional[_PromptEmbedCache] = None,
+    ):
+        self.pipe = pipe
+        self.device = device
+        self.max_batch = max_batch
+        self.embed_cache = embed_cache or _PromptEmbedCache(pipe, device)
+        self._pending: "queue.Queue[_DenoiseRequest]" = queue.Queue()
+        self._decode_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sdxl-decode")
+        # fp32 copy of the VAE for fp16 checkpoints that need an upcast
+        # decode; the shared pipe.vae is never re-cast (see _decode_vae).
+        self._fp32_vae: Optional[Any] = None
+        self._thread = threading.Thread(target=self._loop, name="sdxl-denoise", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str],
+        guidance_scale: float,
+        num_inference_steps: int,
+        width: int,
+        height: int,
+        seed: Optional[int] = None,
+    ) -> Future:
+        """
+        Encode the prompt, prepare latents and queue the request.
+        The returned Future resolves to a PIL image.
+        """
+        request = self._prepare(
+            prompt, negative_prompt, guidance_scale, num_inference_steps, width, height, seed
+        )
+        self._pending.put(request)
+        return request.future
+
+    @torch.inference_mode()
+    def _prepare(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str],
+        guidance_scale: float,
+        num_inference_steps: int,
+        width: int,
+        height: int,
+        seed: Optional[int] = None,
+    ) -> _DenoiseRequest:
+        pipe = self.pipe
+        do_cfg = guidance_scale > 1.0
+
+        embeds = self.embed_cache.get(prompt, negative_prompt)
+        prompt_embeds = embeds["prompt_embeds"]
+        pooled = embeds["pooled_prompt_embeds"]
+
+        # Each request gets its own scheduler instance (schedulers are stateful).
+        scheduler = pipe.scheduler.__class__.from_config(pipe.scheduler.config)
+        scheduler.set_timesteps(num_inference_steps, device=self.device)
+
+        latents = _initial_latents(
+            pipe, width, height, prompt_embeds.dtype, self.device, seed=seed
+        )
+        latents = latents * scheduler.init_noise_sigma
+
+        time_ids = pipe._get_add_time_ids(
+            (height, width),
+            (0, 0),
+            (height, width),
+            dtype=prompt_embeds.dtype,
+            text_encoder_projection_dim=pipe.text_encoder_2.config.projection_dim,
+        ).to(self.device)
+
+        if do_cfg:
+            prompt_embeds = torch.cat([embeds["negative_prompt_embeds"], prompt_embeds])
+            pooled = torch.cat([embeds["negative_pooled_prompt_embeds"], pooled])
+            time_ids = torch.cat([time_ids, time_ids])
+
+        return _DenoiseRequest(
+            latents=latents,
+            scheduler=scheduler,
+            prompt_embeds=prompt_embeds,
+            text_embeds=pooled,
+            time_ids=time_ids,
+            guidance_scale=guidance_scale,
+        )
+
+    def _loop(self) -> None:
+        active: List[_DenoiseRequest] = []
+        while True:
+            if not active:
+                active.append(self._pending.get())  # block while idle
+            while len(active) < self.max_batch:
+                try:
+                    active.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            # One UNet forward per latent shape.
+            groups: Dict[Tuple[int, ...], List[_DenoiseRequest]] = {}
+            for request in active:
+                groups.setdefault(tuple(request.latents.shape), []).append(request)
+
+            for members in groups.values():
+                try:
+                    self._step(members)
+                except Exception as e:  # noqa: BLE001 - fail only this group
+                    logger.exception("SDXL batched denoise step failed: %s", e)
+                    for request in members:
+                        request.future.set_exception(e)
+
+            still_active = []
+            for request in active:
+                if request.future.done():
+                    continue
+                if request.done:
+                    self._decode_pool.submit(self._decode, request)
+                else:
+                    still_active.append(request)
+            active = still_active
+
+    @torch.inference_mode()
+    def _step(self, batch: List[_DenoiseRequest]) -> None:
+        samples, timesteps, embeds, text_embeds, time_ids = [], [], [], [], []
+        for request in batch:
+            t = request.scheduler.timesteps[request.step_idx]
+            rows = request.prompt_embeds.shape[0]
+            latent_in = torch.cat([request.latents] * rows)
+            samples.append(request.scheduler.scale_model_input(latent_in, t))
+            timesteps.append(t.reshape(1).expand(rows))
+            embeds.append(request.prompt_embeds)
+            text_embeds.append(request.text_embeds)
+            time_ids.append(request.time_ids)
+
+        # Never step while a wrapper has DeepCache patched into the UNet.
+        unet_guard = _UNET_PATCH_LOCK if _DEEPCACHE_ENABLED else _NO_GUARD
+        with unet_guard:
+            noise_pred = self.pipe.unet(
+                torch.cat(samples),
+                torch.cat(timesteps),
+                encoder_hidden_states=torch.cat(embeds),
+                added_cond_kwargs={
+                    "text_embeds": torch.cat(text_embeds),
+                    "time_ids": torch.cat(time_ids),
+                },
+                return_dict=False,
+            )[0]
+
+        offset = 0
+        for request in batch:
+            rows = request.prompt_embeds.shape[0]
+            pred = noise_pred[offset:offset + rows]
+            offset += rows
+            if rows == 2:
+                uncond, cond = pred.chunk(2)
+                pred = uncond + request.guidance_scale * (cond - uncond)
+
+            t = request.scheduler.timesteps[request.step_idx]
+            request.latents = request.scheduler.step(
+                pred, t, request.latents, return_dict=False
+            )[0]
+            request.step_idx += 1
+
+    def _decode_vae(self) -> Any:
+        """
+        The VAE to decode with. Instead of upcasting pipe.vae in place (and
+        racing the wrapper's own pipe(...) calls) an fp16 checkpoint that
+        needs an fp32 decode gets a private fp32 copy, made once on the
+        decode thread.
+        """
+        vae = self.pipe.vae
+        if vae.dtype == torch.float16 and getattr(vae.config, "force_upcast", False):
+            if self._fp32_vae is None:
+                self._fp32_vae = copy.deepcopy(vae).to(dtype=torch.float32)
+            return self._fp32_vae
+        return vae
+
+    @torch.inference_mode()
+    def _decode(self, request: _DenoiseRequest) -> None:
+        try:
+            vae = self._decode_vae()
+            latents = request.latents.to(vae.dtype)
+            image = vae.decode(latents / vae.config.scaling_factor, return_dict=False)[0]
+
+            pil_image = self.pipe.image_processor.postprocess(image, output_type="pil")[0]
+            request.future.set_result(pil_image)
+        except Exception as e:  # noqa: BLE001
+            request.future.set_exception(e)
+
+
 # -------------------------------------------------------------------
 # SDXL TXT2IMG wrapper
 # -------------------------------------------------------------------
@@ -76,14 +844,23 @@ class SDXLTxt2ImgPipelineWrapper:
     so that sd3_text2img.py can:
       - save the image to /app/outputs
       - pass back clean JSON metadata to FastAPI.
+
+    stream_batch=True routes every run() through SDXLStepBatchScheduler
+    (same as RENDEREXPO_SDXL_STEP_BATCHING=1), batching up to
+    `stream_batch_size` in-flight requests per UNet forward.
     """
 
-    def __init__(self, model_id: str = "sdxl-base"):
+    def __init__(
+        self,
+        model_id: str = "sdxl-base",
+        stream_batch: bool = False,
+        stream_batch_size: int = 4,
+    ):
         self.model_id = model_id
         self.repo_id = _resolve_repo_id(model_id)
         self.device = _resolve_device()
 
-        dtype = torch.float16 if self.device.type in ("cuda", "mps") else torch.float32
+        dtype = _resolve_dtype(self.device)
 
         logger.info(
             "Loading SDXL TXT2IMG pipeline: model_id=%s, repo_id=%s, device=%s, dtype=%s",
@@ -93,16 +870,27 @@ class SDXLTxt2ImgPipelineWrapper:
             dtype,
         )
 
-        self.pipe: StableDiffusionXLPipeline = StableDiffusionXLPipeline.from_pretrained(
-            self.repo_id,
-            torch_dtype=dtype,
-            use_safetensors=True,
+        self.pipe: StableDiffusionXLPipeline = StableDiffusionXLPipeline(
+            **_pipeline_components(self.repo_id, dtype, self.device)
         )
-        self.pipe.to(self.device)
+
+        self._embed_cache = _PromptEmbedCache(self.pipe, self.device)
+        self._deepcache = _make_deepcache_helper(self.pipe)
+
+        # Optional step-level batching across concurrent requests.
+        self._batcher: Optional[SDXLStepBatchScheduler] = None
+        if stream_batch or _STEP_BATCHING_ENABLED:
+            self._batcher = SDXLStepBatchScheduler(
+                self.pipe,
+                self.device,
+                max_batch=stream_batch_size,
+                embed_cache=self._embed_cache,
+            )
 
         # A friendly display name for logs / responses.
         self.model_name = f"Stable Diffusion XL (txt2img, {self.model_id})"
 
+    @torch.inference_mode()
     def run(
         self,
         prompt: str,
@@ -133,22 +921,42 @@ class SDXLTxt2ImgPipelineWrapper:
         if height is None:
             height = 768
 
-        with torch.inference_mode():
-            out = self.pipe(
+        if self._batcher is not None:
+            pil_image = self._batcher.submit(
                 prompt=prompt,
                 negative_prompt=negative_prompt,
                 guidance_scale=cfg_scale,
                 num_inference_steps=num_inference_steps,
                 width=width,
                 height=height,
-            )
+                seed=extra.get("seed"),
+            ).result()
+        else:
+            with _deepcache(self._deepcache):
+                out = self.pipe(
+                    **self._embed_cache.get(prompt, negative_prompt),
+                    latents=_initial_latents(
+                        self.pipe,
+                        width,
+                        height,
+                        self.pipe.unet.dtype,
+                        self.device,
+                        seed=extra.get("seed"),
+                    ),
+                    guidance_scale=cfg_scale,
+                    num_inference_steps=num_inference_steps,
+                    width=width,
+                    height=height,
+                )
 
-        pil_image = out.images[0]
+            pil_image = out.images[0]
 
         return {
             "type": "txt2img",
             "model_id": self.model_id,
             "model_name": self.model_name,
+            "device": str(self.device),
+            "scheduler": type(self.pipe.scheduler).__name__,
             "pil_image": pil_image,
             "params": {
                 "prompt": prompt,
@@ -182,7 +990,7 @@ class SDXLImg2ImgPipelineWrapper:
         self.repo_id = _resolve_repo_id(model_id)
         self.device = _resolve_device()
 
-        dtype = torch.float16 if self.device.type in ("cuda", "mps") else torch.float32
+        dtype = _resolve_dtype(self.device)
 
         logger.info(
             "Loading SDXL IMG2IMG pipeline: model_id=%s, repo_id=%s, device=%s, dtype=%s",
@@ -192,17 +1000,15 @@ class SDXLImg2ImgPipelineWrapper:
             dtype,
         )
 
-        self.pipe: StableDiffusionXLImg2ImgPipeline = (
-            StableDiffusionXLImg2ImgPipeline.from_pretrained(
-                self.repo_id,
-                torch_dtype=dtype,
-                use_safetensors=True,
-            )
+        self.pipe: StableDiffusionXLImg2ImgPipeline = StableDiffusionXLImg2ImgPipeline(
+            **_pipeline_components(self.repo_id, dtype, self.device)
         )
-        self.pipe.to(self.device)
+        self._embed_cache = _PromptEmbedCache(self.pipe, self.device)
+        self._deepcache = _make_deepcache_helper(self.pipe)
 
         self.model_name = f"Stable Diffusion XL (img2img, {self.model_id})"
 
+    @torch.inference_mode()
     def run(
         self,
         prompt: str,
@@ -233,11 +1039,10 @@ class SDXLImg2ImgPipelineWrapper:
             num_inference_steps = 25
 
         # width/height are optional; SDXL can infer from init_image.
-        with torch.inference_mode():
+        with _deepcache(self._deepcache):
             out = self.pipe(
-                prompt=prompt,
+                **self._embed_cache.get(prompt, negative_prompt),
                 image=init_image,
-                negative_prompt=negative_prompt,
                 strength=strength,
                 guidance_scale=guidance_scale,
                 num_inference_steps=num_inference_steps,
@@ -251,6 +1056,8 @@ class SDXLImg2ImgPipelineWrapper:
             "type": "img2img",
             "model_id": self.model_id,
             "model_name": self.model_name,
+            "device": str(self.device),
+            "scheduler": type(self.pipe.scheduler).__name__,
             "pil_image": pil_image,
             "params": {
                 "prompt": prompt,
@@ -269,12 +1076,15 @@ class SDXLImg2ImgPipelineWrapper:
 # Factory functions used by pipeline_manager.py
 # -------------------------------------------------------------------
 
-def create_sdxl_txt2img_pipeline(model_id: str = "sdxl-base") -> SDXLTxt2ImgPipelineWrapper:
+def create_sdxl_txt2img_pipeline(
+    model_id: str = "sdxl-base",
+    stream_batch: bool = False,
+) -> SDXLTxt2ImgPipelineWrapper:
     """
     Factory for SDXL txt2img wrapper.
     Called by pipeline_manager._load_txt2img_pipeline(...)
     """
-    return SDXLTxt2ImgPipelineWrapper(model_id=model_id)
+    return SDXLTxt2ImgPipelineWrapper(model_id=model_id, stream_batch=stream_batch)
 
 
 def create_sdxl_img2img_pipeline(model_id: str = "sdxl-base") -> SDXLImg2ImgPipelineWrapper:
@@ -286,8 +1096,10 @@ def create_sdxl_img2img_pipeline(model_id: str = "sdxl-base") -> SDXLImg2ImgPipe
 
 
 __all__ = [
+    "SDXLStepBatchScheduler",
     "SDXLTxt2ImgPipelineWrapper",
     "SDXLImg2ImgPipelineWrapper",
     "create_sdxl_txt2img_pipeline",
     "create_sdxl_img2img_pipeline",
+    "reset_device_cache",
 ]
@@ -11,8 +11,14 @@ except ImportError:
         return logging.getLogger(name)
 
 from config import app_config  # type: ignore
-from file_utils import generate_output_filename  # type: ignore
-
+from file_utils import (  # type: ignore
+    ensure_output_dir,
+    generate_output_filename,
+    output_image_ext,
+    save_output_image,
+)
+
+from ._img2img_base import _debug_info
 from .pipeline_manager import get_txt2img_pipeline
 
 logger = get_logger(__name__)
@@ -23,8 +29,7 @@ OUTPUTS_DIR = BACKEND_ROOT / "outputs"
 
 
 def _ensure_outputs_dir() -> Path:
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-    return OUTPUTS_DIR
+    return ensure_output_dir(OUTPUTS_DIR)
 
 
 def run_txt2img(
@@ -54,7 +59,7 @@ def run_txt2img(
     height = height or app_config.txt2img_default_height
 
     outputs_dir = _ensure_outputs_dir()
-    filename = generate_output_filename(prefix="txt2img", ext="png")
+    filename = generate_output_filename(prefix="txt2img", ext=output_image_ext())
     output_path = outputs_dir / filename
 
     # Fetch pipeline (SDXL or Dummy)
@@ -76,7 +81,7 @@ def run_txt2img(
 
     if pil_image is not None:
         try:
-            pil_image.save(output_path)
+            save_output_image(pil_image, output_path)
             logger.info("Saved REAL TXT2IMG image to %s", output_path)
         except Exception as e:
             logger.error(
@@ -103,7 +108,7 @@ def run_txt2img(
         "num_inference_steps": num_inference_steps,
         "output_image_path": str(output_path),
         "params": pipeline_result.get("params", {}),
-        "debug": pipeline_result,  # always JSON-safe now
+        "debug": _debug_info(pipeline_result),
     }
 
     return response
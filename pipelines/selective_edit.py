@@ -13,7 +13,7 @@ Behavior:
 
 import logging
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from file_utils import validate_image_file  # type: ignore
 from pipelines.presets import get_presets       # type: ignore
@@ -22,6 +22,32 @@ from pipelines.sd3_img2img import generate_sd3_img2img  # type: ignore
 
 logger = logging.getLogger(__name__)
 
+# (category, preset key) -> prompt snippet, built once from the static presets.
+# "style" resolves across the style groups in order, first group wins.
+_STYLE_GROUPS = ("architecture_styles", "interior_styles", "landscape_site")
+_SNIPPET_CATEGORIES = {
+    "lighting": "lighting",
+    "camera": "camera",
+    "mood": "mood",
+    "furniture_style": "furniture_styles",
+}
+
+
+def _build_snippet_index() -> Dict[Tuple[str, str], str]:
+    presets = get_presets()
+    index: Dict[Tuple[str, str], str] = {}
+    for group in _STYLE_GROUPS:
+        for key, preset in presets.get(group, {}).items():
+            index.setdefault(("style", key), preset.get("prompt_snippet") or "")
+    for category, group in _SNIPPET_CATEGORIES.items():
+        for key, preset in presets.get(group, {}).items():
+            index[(category, key)] = preset.get("prompt_snippet") or ""
+    return index
+
+
+_SNIPPET_INDEX = _build_snippet_index()
+
+
 def _apply_presets_to_prompt(
     base_prompt: str,
     style: Optional[str],
@@ -34,60 +60,23 @@ def _apply_presets_to_prompt(
     """
     Append prompt snippets from the presets library based on keys.
     """
-    prompt = base_prompt
-    presets = get_presets()
-
-    # STYLE
-    if style:
-        for group in ["architecture_styles", "interior_styles", "landscape_site"]:
-            group_dict = presets.get(group, {})
-            if style in group_dict:
-                snippet = group_dict[style].get("prompt_snippet")
-                if snippet:
-                    prompt += ", " + snippet
-                break
-
-    # LIGHTING
-    if lighting:
-        lighting_dict = presets.get("lighting", {})
-        if lighting in lighting_dict:
-            snippet = lighting_dict[lighting].get("prompt_snippet")
-            if snippet:
-                prompt += ", " + snippet
-
-    # CAMERA
-    if camera:
-        camera_dict = presets.get("camera", {})
-        if camera in camera_dict:
-            snippet = camera_dict[camera].get("prompt_snippet")
-            if snippet:
-                prompt += ", " + snippet
-
-    # MOOD
-    if mood:
-        mood_dict = presets.get("mood", {})
-        if mood in mood_dict:
-            snippet = mood_dict[mood].get("prompt_snippet")
-            if snippet:
-                prompt += ", " + snippet
-
-    # FURNITURE STYLE
-    if furniture_style:
-        furn_dict = presets.get("furniture_styles", {})
-        if furniture_style in furn_dict:
-            snippet = furn_dict[furniture_style].get("prompt_snippet")
-            if snippet:
-                prompt += ", " + snippet
+    snippets = [
+        _SNIPPET_INDEX.get((category, key))
+        for category, key in (
+            ("style", style),
+            ("lighting", lighting),
+            ("camera", camera),
+            ("mood", mood),
+            ("furniture_style", furniture_style),
+        )
+        if key
+    ]
 
     # MATERIAL
     if material_key:
-        mat = MATERIAL_LIBRARY.get(material_key)
-        if mat:
-            snippet = mat.get("prompt_snippet")
-            if snippet:
-                prompt += ", " + snippet
+        snippets.append(MATERIAL_LIBRARY.get(material_key, {}).get("prompt_snippet"))
 
-    return prompt
+    return ", ".join([base_prompt, *filter(None, snippets)])
 
 
 def selective_edit(
@@ -21,9 +21,23 @@ from typing import List
 from config import OUTPUTS_DIR
 from file_utils import generate_output_filename
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 
+def _dump_bundle(payload: dict) -> bytes:
+    """
+    Serialize the bundle as indented UTF-8 JSON (orjson when available).
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+    return json.dumps(payload, indent=2).encode("utf-8")
+
+
 def generate_space_reconstruction_stub(image_paths: List[str]) -> dict:
     """
     Create a stub "space bundle" JSON under /app/outputs.
@@ -39,14 +53,12 @@ def generate_space_reconstruction_stub(image_paths: List[str]) -> dict:
     - engine: 'stub'
     - notes: human-readable description
     """
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-
     # JSON file name
     bundle_filename = generate_output_filename(prefix="space_bundle", ext="json")
     bundle_path = OUTPUTS_DIR / bundle_filename
 
     # Placeholder mesh path (no actual mesh file is created here)
-    mesh_placeholder = OUTPUTS_DIR / (bundle_filename.replace(".json", ".obj"))
+    mesh_placeholder = bundle_path.with_suffix(".obj")
 
     # Basic fake navigation points (front / left / right / back)
     navigation_points = [
@@ -91,8 +103,7 @@ def generate_space_reconstruction_stub(image_paths: List[str]) -> dict:
     }
 
     try:
-        with bundle_path.open("w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2)
+        bundle_path.write_bytes(_dump_bundle(payload))
         logger.info("Space capture stub bundle written to %s", bundle_path)
     except Exception as e:
         logger.exception("Failed to write space capture stub bundle")
@@ -1,5 +1,7 @@
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 try:
     from logs.log_utils import get_logger  # type: ignore
@@ -11,16 +13,32 @@ except ImportError:
     def get_logger(name: str):
         return logging.getLogger(name)
 
-from file_utils import generate_output_filename, validate_image_file  # type: ignore
+from file_utils import (  # type: ignore
+    ensure_output_dir,
+    generate_output_filename,
+    output_image_ext,
+    save_output_array,
+    save_output_image,
+    validate_image_file,
+)
 from PIL import Image
 
 logger = get_logger(__name__)
 
+# OpenCV is used by the real path and, on its own, for a SIMD LANCZOS
+# placeholder resize; keep it independent of the realesrgan import.
+try:
+    import cv2  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    cv2 = None  # type: ignore
+
 # Try to import realesrgan + torch. If not available, we will fall back
-# to a high-quality Pillow resize (LANCZOS) so the pipeline still works.
+# to a high-quality LANCZOS resize so the pipeline still works.
 try:
     import torch  # type: ignore
+    from basicsr.archs.rrdbnet_arch import RRDBNet  # type: ignore
     from realesrgan import RealESRGANer  # type: ignore
+    from realesrgan.archs.srvgg_arch import SRVGGNetCompact  # type: ignore
 except ImportError as e:  # pragma: no cover - defensive
     logger.warning(
         "Real-ESRGAN or torch not available. ESRGAN upscaler will use a "
@@ -28,7 +46,9 @@ except ImportError as e:  # pragma: no cover - defensive
         e,
     )
     torch = None  # type: ignore
+    RRDBNet = None  # type: ignore
     RealESRGANer = None  # type: ignore
+    SRVGGNetCompact = None  # type: ignore
 
 
 # Backend/pipelines/upscale_esrgan.py
@@ -48,29 +68,165 @@ DEFAULT_ESRGAN_WEIGHTS = MODELS_ROOT / f"{DEFAULT_ESRGAN_MODEL_NAME}.pth"
 
 
 def _ensure_outputs_dir() -> Path:
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
-    return OUTPUTS_DIR
+    return ensure_output_dir(OUTPUTS_DIR)
+
+
+# Loaded upscalers keyed by (weights path, model name, device, tile), most recent last.
+# Loading the .pth and building RealESRGANer costs seconds per request
+# otherwise; the cap keeps at most a couple of models resident in VRAM.
+# Each entry carries its own lock: RealESRGANer.enhance() keeps the current
+# image, padding and output on the instance, so calls must not overlap.
+_UPSCALER_CACHE_MAX = 2
+_UPSCALER_CACHE: "OrderedDict[Tuple[str, str, str, int], Tuple[Any, threading.Lock]]" = OrderedDict()
+_UPSCALER_LOCK = threading.Lock()
+
+
+def clear_esrgan_cache() -> None:
+    """
+    Drop every cached RealESRGANer and release the CUDA memory they held.
+    """
+    with _UPSCALER_LOCK:
+        _UPSCALER_CACHE.clear()
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# Cards below this much VRAM enhance in 256px tiles instead of one pass.
+_SMALL_VRAM_BYTES = 10 * 1024**3
+_SMALL_VRAM_TILE = 256
+
+
+def _auto_tile(device: str) -> int:
+    """
+    0 (whole image in one pass) unless this is a small-VRAM CUDA card.
+    """
+    if device != "cuda":
+        return 0
+    total = torch.cuda.get_device_properties(0).total_memory
+    return _SMALL_VRAM_TILE if total < _SMALL_VRAM_BYTES else 0
+
+
+# Network layout and native scale of each released Real-ESRGAN checkpoint
+# (as in Real-ESRGAN's inference_realesrgan.py). Builders are lambdas so the
+# optional arch classes are only touched when a real upscaler is created.
+_ESRGAN_ARCHS = {
+    "RealESRGAN_x4plus": (
+        lambda: RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=4),
+        4,
+    ),
+    "RealESRNet_x4plus": (
+        lambda: RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=4),
+        4,
+    ),
+    "RealESRGAN_x4plus_anime_6B": (
+        lambda: RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=6, num_grow_ch=32, scale=4),
+        4,
+    ),
+    "RealESRGAN_x2plus": (
+        lambda: RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=2),
+        2,
+    ),
+    "realesr-animevideov3": (
+        lambda: SRVGGNetCompact(num_in_ch=3, num_out_ch=3, num_feat=64, num_conv=16, upscale=4, act_type="prelu"),
+        4,
+    ),
+    "realesr-general-x4v3": (
+        lambda: SRVGGNetCompact(num_in_ch=3, num_out_ch=3, num_feat=64, num_conv=32, upscale=4, act_type="prelu"),
+        4,
+    ),
+}
+
+
+def _load_esrgan_net(model_path: Path, build_net: Any) -> "torch.nn.Module":  # type: ignore
+    """
+    Build the network for a Real-ESRGAN checkpoint (build_net, from
+    _ESRGAN_ARCHS) and load its weights memory-mapped.
+
+    The module is created on the meta device and the mmap'd tensors are
+    assigned to it directly, so the weights are never copied into a second
+    host buffer before moving to the target device. Legacy (non-zip) .pth
+    files cannot be mmap'd and are read normally.
+    """
+    try:
+        state = torch.load(
+            str(model_path), map_location="cpu", mmap=True, weights_only=True
+        )
+    except RuntimeError:
+        state = torch.load(str(model_path), map_location="cpu", weights_only=True)
+    state = state.get("params_ema", state.get("params", state))
+
+    with torch.device("meta"):
+        net = build_net()
+    net.load_state_dict(state, strict=True, assign=True)
+    return net.eval()
+
+
+if RealESRGANer is not None:
+
+    class _MmapRealESRGANer(RealESRGANer):  # type: ignore[misc, valid-type]
+        """
+        RealESRGANer that takes an already-loaded network instead of reading
+        the checkpoint itself (see _load_esrgan_net).
+        """
+
+        def __init__(
+            self,
+            scale: int,
+            model: "torch.nn.Module",  # type: ignore
+            device: str,
+            tile: int = 0,
+            tile_pad: int = 10,
+            pre_pad: int = 10,
+            half: bool = False,
+        ) -> None:
+            self.scale = scale
+            self.tile_size = tile
+            self.tile_pad = tile_pad
+            self.pre_pad = pre_pad
+            self.mod_scale = None
+            self.half = half
+            self.device = torch.device(device)
+            self.model = model.to(self.device)
+            if half:
+                self.model = self.model.half()
 
 
 def _get_real_esrgan_upscaler(
     model_path: Path,
-    scale: int = 2,
-    tile: int = 0,
+    model_name: str = DEFAULT_ESRGAN_MODEL_NAME,
+    tile: Optional[int] = None,
     tile_pad: int = 10,
-) -> Optional["RealESRGANer"]:  # type: ignore
+) -> Optional[Tuple["RealESRGANer", threading.Lock]]:  # type: ignore
     """
     Try to create a RealESRGANer upscaler if realesrgan + torch are available
-    and the model weights exist.
+    and the model weights exist. Returns the upscaler with the lock to hold
+    around its enhance() calls.
+
+    The network architecture and native scale come from model_name (see
+    _ESRGAN_ARCHS); the requested output scale is applied in enhance().
+    On CUDA the model runs in fp16 (tensor cores) with cuDNN autotuning;
+    tile=None picks a tile size from the card's VRAM. Weights are loaded
+    memory-mapped (_load_esrgan_net).
 
     If anything fails, returns None and logs an explanation.
     """
-    if RealESRGANer is None or torch is None:
+    if RealESRGANer is None or torch is None or cv2 is None:
         logger.warning(
             "Real-ESRGAN library is not available. "
             "Falling back to placeholder resize."
         )
         return None
 
+    arch = _ESRGAN_ARCHS.get(model_name)
+    if arch is None:
+        logger.warning(
+            "Unknown Real-ESRGAN model %r (known: %s). "
+            "Falling back to placeholder resize.",
+            model_name,
+            ", ".join(sorted(_ESRGAN_ARCHS)),
+        )
+        return None
+
     if not model_path.is_file():
         logger.warning(
             "Real-ESRGAN weights not found at %s. "
@@ -79,32 +235,88 @@ def _get_real_esrgan_upscaler(
         )
         return None
 
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if tile is None:
+        tile = _auto_tile(device)
+    key = (str(model_path), model_name, device, tile)
+
+    with _UPSCALER_LOCK:
+        entry = _UPSCALER_CACHE.get(key)
+        if entry is not None:
+            _UPSCALER_CACHE.move_to_end(key)
+            return entry
+
     try:
+        build_net, netscale = arch
         logger.info(
-            "Creating RealESRGANer upscaler: model=%s, scale=%d",
+            "Creating RealESRGANer upscaler: model=%s, weights=%s, netscale=%d",
+            model_name,
             model_path.name,
-            scale,
+            netscale,
         )
 
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-
-        upscaler = RealESRGANer(
-            scale=scale,
-            model_path=str(model_path),
-            model=DEFAULT_ESRGAN_MODEL_NAME,
+        upscaler = _MmapRealESRGANer(
+            scale=netscale,
+            model=_load_esrgan_net(model_path, build_net),
             device=device,
             tile=tile,
             tile_pad=tile_pad,
+            half=device == "cuda",
         )
+        if device == "cuda":
+            torch.backends.cudnn.benchmark = True
 
-        logger.info("RealESRGANer created successfully on device=%s", device)
-        return upscaler
+        logger.info("RealESRGANer created successfully on device=%s, tile=%d", device, tile)
+
+        with _UPSCALER_LOCK:
+            # Another thread may have built the same upscaler meanwhile;
+            # keep its entry so everyone shares one lock.
+            entry = _UPSCALER_CACHE.setdefault(key, (upscaler, threading.Lock()))
+            _UPSCALER_CACHE.move_to_end(key)
+            while len(_UPSCALER_CACHE) > _UPSCALER_CACHE_MAX:
+                _UPSCALER_CACHE.popitem(last=False)
+        return entry
 
     except Exception as e:  # pragma: no cover - defensive
-        logger.error("Failed to create RealESRGANer. Error: %s", e)
+        logger.warning(
+            "Failed to create RealESRGANer for %s; falling back to placeholder "
+            "resize. Error: %s",
+            model_name,
+            e,
+        )
         return None
 
 
+def _lanczos_upscale(input_image_path: Path, scale: int, output_path: Path) -> None:
+    """
+    Placeholder upscale: LANCZOS resize of the input image into output_path.
+
+    With OpenCV this stays in BGR arrays and uses cv2.INTER_LANCZOS4, which
+    is vectorized (SSE/AVX); stock Pillow's LANCZOS is scalar C. Without
+    OpenCV it falls back to Pillow, where draft() lets the JPEG decoder emit
+    RGB directly instead of decoding YCbCr and converting afterwards.
+    """
+    if cv2 is not None:
+        bgr = cv2.imread(str(input_image_path), cv2.IMREAD_COLOR)
+        if bgr is not None:
+            height, width = bgr.shape[:2]
+            upscaled = cv2.resize(
+                bgr,
+                (width * scale, height * scale),
+                interpolation=cv2.INTER_LANCZOS4,
+            )
+            save_output_array(upscaled, output_path)
+            return
+
+    with Image.open(input_image_path) as image:
+        image.draft("RGB", image.size)
+        image = image.convert("RGB")
+        new_width = image.width * scale
+        new_height = image.height * scale
+        upscaled = image.resize((new_width, new_height), Image.LANCZOS)
+    save_output_image(upscaled, output_path)
+
+
 def run_esrgan_upscale(
     input_image_path: Union[str, Path],
     scale: int = 2,
@@ -119,7 +331,7 @@ def run_esrgan_upscale(
       - Validates that 'input_image_path' exists and is an image.
       - Attempts to use Real-ESRGAN if available and weights are present.
       - If Real-ESRGAN is unavailable, falls back to a high-quality
-        Pillow resize (LANCZOS) so the call still succeeds.
+        LANCZOS resize (OpenCV, else Pillow) so the call still succeeds.
 
     Returns a structured dict similar to other pipelines, with:
       - status
@@ -142,34 +354,29 @@ def run_esrgan_upscale(
     validate_image_file(input_image_path)
 
     outputs_dir = _ensure_outputs_dir()
-    filename = generate_output_filename(prefix="upscale_esrgan", ext="png")
+    filename = generate_output_filename(prefix="upscale_esrgan", ext=output_image_ext())
     output_path = outputs_dir / filename
 
     # Decide which weights path to use.
     if model_weights_path is not None:
         model_weights = Path(model_weights_path)
     else:
-        model_weights = DEFAULT_ESRGAN_WEIGHTS
+        model_weights = MODELS_ROOT / f"{model_name}.pth"
 
     # Try to get a REAL ESRGAN upscaler.
-    upscaler = _get_real_esrgan_upscaler(
+    entry = _get_real_esrgan_upscaler(
         model_path=model_weights,
-        scale=scale,
+        model_name=model_name,
     )
 
-    # Load the input image once.
-    image = Image.open(input_image_path).convert("RGB")
-
-    if upscaler is None:
-        # Placeholder path: use Pillow's LANCZOS resize to mimic upscaling.
+    if entry is None:
+        # Placeholder path: use a LANCZOS resize to mimic upscaling.
         logger.warning(
-            "Real-ESRGAN not available; using Pillow LANCZOS resize as placeholder."
+            "Real-ESRGAN (%s) not available; using LANCZOS resize as placeholder.",
+            model_name,
         )
 
-        new_width = image.width * scale
-        new_height = image.height * scale
-        upscaled = image.resize((new_width, new_height), Image.LANCZOS)
-        upscaled.save(output_path)
+        _lanczos_upscale(input_image_path, scale, output_path)
 
         logger.info(
             "Saved placeholder upscaled image (LANCZOS) to %s", output_path
@@ -188,14 +395,21 @@ def run_esrgan_upscale(
                 "extra": extra,
             },
             "debug": {
-                "reason": "Real-ESRGAN not available; used Pillow LANCZOS resize.",
+                "reason": "Real-ESRGAN not available; used LANCZOS resize.",
             },
         }
 
-    # REAL ESRGAN path.
+    # REAL ESRGAN path: RealESRGANer works on BGR uint8 arrays, so decode and
+    # encode with OpenCV directly instead of going PIL -> numpy -> PIL.
     try:
-        upscaled, _ = upscaler.enhance(image)
-        upscaled.save(output_path)
+        bgr = cv2.imread(str(input_image_path), cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError(f"OpenCV could not decode {input_image_path}")
+
+        upscaler, enhance_lock = entry
+        with enhance_lock, torch.inference_mode():
+            upscaled, _ = upscaler.enhance(bgr, outscale=scale)
+        save_output_array(upscaled, output_path)
         logger.info("Saved REAL ESRGAN upscaled image to %s", output_path)
 
         return {
@@ -220,10 +434,7 @@ def run_esrgan_upscale(
 
         # In case of failure, we still try to give the caller something.
         try:
-            new_width = image.width * scale
-            new_height = image.height * scale
-            upscaled = image.resize((new_width, new_height), Image.LANCZOS)
-            upscaled.save(output_path)
+            _lanczos_upscale(input_image_path, scale, output_path)
             fallback_saved = True
         except Exception as e2:  # pragma: no cover - defensive
             logger.error(
@@ -253,4 +464,5 @@ def run_esrgan_upscale(
 
 __all__ = [
     "run_esrgan_upscale",
+    "clear_esrgan_cache",
 ]
@@ -15,95 +15,235 @@ Later, on GPU:
 - The API contract stays the same, so the frontend doesn’t have to change.
 """
 
+import asyncio
+import collections
 import logging
 import subprocess
+from fractions import Fraction
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 from config import OUTPUTS_DIR
 from file_utils import validate_image_file, generate_output_filename
 
+try:
+    import av  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    av = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+_FPS = 24
 
-def _run_ffmpeg_still_to_video(
-    input_image: Path,
-    output_video: Path,
-    duration_seconds: float,
-) -> Dict[str, Any]:
-    """
-    Use ffmpeg to create a simple MP4 video from a single still image.
+# Only the last lines of ffmpeg's stderr are kept for the debug payload;
+# stdout is discarded.
+_STDERR_TAIL_LINES = 64
 
-    Command pattern (roughly):
-      ffmpeg -y -loop 1 -i input.png -t 3 -r 24 -c:v libx264 -pix_fmt yuv420p out.mp4
+# ffmpeg is CPU-heavy on its own; cap how many encodes the async path runs
+# at once.
+_FFMPEG_SEMAPHORE = asyncio.Semaphore(2)
 
-    -loop 1     : loop the single frame as a "video"
-    -t <seconds>: duration
-    -r 24       : frame rate
-    -c:v libx264 -pix_fmt yuv420p : standard MP4 encoding
-    """
-    cmd = [
+
+def _ffmpeg_cmd(input_image: Path, output_video: Path, duration_seconds: float) -> List[str]:
+    return [
         "ffmpeg",
         "-y",  # overwrite
+        "-framerate",
+        str(_FPS),
         "-loop",
         "1",
         "-i",
         str(input_image),
         "-t",
         str(duration_seconds),
-        "-r",
-        "24",
         "-c:v",
         "libx264",
+        "-preset",
+        "ultrafast",
+        "-tune",
+        "stillimage",
         "-pix_fmt",
         "yuv420p",
+        "-movflags",
+        "+faststart",
         str(output_video),
     ]
 
+
+def _encode_still_with_pyav(
+    input_image: Path,
+    output_video: Path,
+    duration_seconds: float,
+) -> Optional[Dict[str, Any]]:
+    """
+    Encode the still clip in-process with PyAV instead of spawning ffmpeg.
+
+    The image is decoded and converted to yuv420p once; the same VideoFrame
+    is then re-stamped with each pts, so libx264 (ultrafast/stillimage)
+    only emits near-empty P-frames after the first keyframe.
+
+    Returns a result dict shaped like _ffmpeg_result, or None when PyAV is
+    not installed or the encode fails (the caller then runs ffmpeg).
+    """
+    if av is None:
+        return None
+
+    command = f"pyav:libx264 {input_image} -> {output_video}"
+    try:
+        with av.open(str(input_image)) as src:
+            frame = next(src.decode(video=0)).reformat(format="yuv420p")
+
+        with av.open(
+            str(output_video), mode="w", options={"movflags": "+faststart"}
+        ) as container:
+            stream = container.add_stream("libx264", rate=_FPS)
+            stream.width = frame.width
+            stream.height = frame.height
+            stream.pix_fmt = "yuv420p"
+            stream.options = {"preset": "ultrafast", "tune": "stillimage"}
+
+            frame.time_base = Fraction(1, _FPS)
+            for pts in range(max(1, int(duration_seconds * _FPS))):
+                frame.pts = pts
+                for packet in stream.encode(frame):
+                    container.mux(packet)
+            for packet in stream.encode():  # flush
+                container.mux(packet)
+    except Exception:
+        logger.exception("PyAV still-to-video encode failed; falling back to ffmpeg.")
+        return None
+
+    logger.info("PyAV video creation succeeded: %s", output_video)
+    return {
+        "success": True,
+        "returncode": 0,
+        "stdout": "",
+        "stderr": "",
+        "command": command,
+    }
+
+
+def _ffmpeg_result(
+    cmd: List[str], output_video: Path, returncode: int, stderr_tail: collections.deque
+) -> Dict[str, Any]:
+    success = returncode == 0
+    stderr = b"".join(stderr_tail).decode("utf-8", errors="ignore")
+    if success:
+        logger.info("ffmpeg video creation succeeded: %s", output_video)
+    else:
+        logger.error(
+            "ffmpeg video creation failed (code=%s). stderr=%s",
+            returncode,
+            stderr,
+        )
+    return {
+        "success": success,
+        "returncode": returncode,
+        "stdout": "",
+        "stderr": stderr,
+        "command": " ".join(cmd),
+    }
+
+
+def _ffmpeg_failure(cmd: List[str], stderr: str) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "returncode": None,
+        "stdout": "",
+        "stderr": stderr,
+        "command": " ".join(cmd),
+    }
+
+
+def _run_ffmpeg_still_to_video(
+    input_image: Path,
+    output_video: Path,
+    duration_seconds: float,
+) -> Dict[str, Any]:
+    """
+    Use ffmpeg to create a simple MP4 video from a single still image.
+
+    Command pattern (roughly):
+      ffmpeg -y -framerate 24 -loop 1 -i input.png -t 3 -c:v libx264
+             -preset ultrafast -tune stillimage -pix_fmt yuv420p
+             -movflags +faststart out.mp4
+
+    -framerate 24 -loop 1 : loop the single frame as a 24 fps "video"
+    -t <seconds>: duration
+    -preset ultrafast -tune stillimage : the frames are identical, so skip
+                  the expensive motion search and let P-frames be ~empty
+    -c:v libx264 -pix_fmt yuv420p : standard MP4 encoding
+    -movflags +faststart : moov atom up front so playback starts at once
+
+    When PyAV is installed the same encode runs in-process instead (see
+    _encode_still_with_pyav); the subprocess is the fallback.
+    """
+    result = _encode_still_with_pyav(input_image, output_video, duration_seconds)
+    if result is not None:
+        return result
+
+    cmd = _ffmpeg_cmd(input_image, output_video, duration_seconds)
     logger.info("Running ffmpeg command: %s", " ".join(cmd))
 
     try:
-        proc = subprocess.run(
+        tail: collections.deque = collections.deque(maxlen=_STDERR_TAIL_LINES)
+        with subprocess.Popen(
             cmd,
-            stdout=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
             stderr=subprocess.PIPE,
-            check=False,
-        )
-        success = proc.returncode == 0
-        if success:
-            logger.info("ffmpeg video creation succeeded: %s", output_video)
-        else:
-            logger.error(
-                "ffmpeg video creation failed (code=%s). stderr=%s",
-                proc.returncode,
-                proc.stderr.decode("utf-8", errors="ignore"),
+        ) as proc:
+            for line in proc.stderr:
+                tail.append(line)
+            returncode = proc.wait()
+        return _ffmpeg_result(cmd, output_video, returncode, tail)
+    except FileNotFoundError:
+        # ffmpeg not installed or not in PATH
+        logger.exception("ffmpeg not found. Video stub will fall back.")
+        return _ffmpeg_failure(cmd, "ffmpeg executable not found")
+    except Exception:
+        logger.exception("Unexpected error while running ffmpeg.")
+        return _ffmpeg_failure(cmd, "unexpected exception running ffmpeg")
+
+
+async def _run_ffmpeg_still_to_video_async(
+    input_image: Path,
+    output_video: Path,
+    duration_seconds: float,
+) -> Dict[str, Any]:
+    """
+    Same as _run_ffmpeg_still_to_video, but awaits ffmpeg as an asyncio
+    subprocess so the event loop keeps serving other requests meanwhile.
+    """
+    if av is not None:
+        async with _FFMPEG_SEMAPHORE:
+            result = await asyncio.to_thread(
+                _encode_still_with_pyav, input_image, output_video, duration_seconds
             )
-        return {
-            "success": success,
-            "returncode": proc.returncode,
-            "stdout": proc.stdout.decode("utf-8", errors="ignore"),
-            "stderr": proc.stderr.decode("utf-8", errors="ignore"),
-            "command": " ".join(cmd),
-        }
+        if result is not None:
+            return result
+
+    cmd = _ffmpeg_cmd(input_image, output_video, duration_seconds)
+    logger.info("Running ffmpeg command: %s", " ".join(cmd))
+
+    try:
+        async with _FFMPEG_SEMAPHORE:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            tail: collections.deque = collections.deque(maxlen=_STDERR_TAIL_LINES)
+            async for line in proc.stderr:
+                tail.append(line)
+            returncode = await proc.wait()
+        return _ffmpeg_result(cmd, output_video, returncode, tail)
     except FileNotFoundError:
         # ffmpeg not installed or not in PATH
         logger.exception("ffmpeg not found. Video stub will fall back.")
-        return {
-            "success": False,
-            "returncode": None,
-            "stdout": "",
-            "stderr": "ffmpeg executable not found",
-            "command": " ".join(cmd),
-        }
+        return _ffmpeg_failure(cmd, "ffmpeg executable not found")
     except Exception:
         logger.exception("Unexpected error while running ffmpeg.")
-        return {
-            "success": False,
-            "returncode": None,
-            "stdout": "",
-            "stderr": "unexpected exception running ffmpeg",
-            "command": " ".join(cmd),
-        }
+        return _ffmpeg_failure(cmd, "unexpected exception running ffmpeg")
 
 
 def generate_video_from_image(
@@ -135,6 +275,50 @@ def generate_video_from_image(
           "debug": {...}
         }
     """
+    image_path, output_video_path, duration = _prepare_video_job(
+        input_image_path, duration_seconds
+    )
+
+    # Try ffmpeg
+    ffmpeg_debug = _run_ffmpeg_still_to_video(
+        input_image=image_path,
+        output_video=output_video_path,
+        duration_seconds=duration,
+    )
+
+    return _finish_video_job(
+        image_path, output_video_path, duration, camera_motion, ffmpeg_debug
+    )
+
+
+async def generate_video_from_image_async(
+    input_image_path: str,
+    duration_seconds: float = 3.0,
+    camera_motion: str = "orbit",
+) -> Dict[str, Any]:
+    """
+    Async variant of generate_video_from_image for async route handlers.
+    Same parameters and return value.
+    """
+    image_path, output_video_path, duration = _prepare_video_job(
+        input_image_path, duration_seconds
+    )
+
+    ffmpeg_debug = await _run_ffmpeg_still_to_video_async(
+        input_image=image_path,
+        output_video=output_video_path,
+        duration_seconds=duration,
+    )
+
+    return _finish_video_job(
+        image_path, output_video_path, duration, camera_motion, ffmpeg_debug
+    )
+
+
+def _prepare_video_job(input_image_path: str, duration_seconds: float) -> Tuple[Path, Path, float]:
+    """
+    Validate the input image, clamp the duration and reserve the output path.
+    """
     image_path = Path(input_image_path)
 
     # Validate that the image exists and is a supported format.
@@ -149,17 +333,17 @@ def generate_video_from_image(
     duration = max(0.5, min(duration, 10.0))  # 0.5s - 10s
 
     # Generate an output filename under OUTPUTS_DIR
-    OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
     video_filename = generate_output_filename(prefix="video_from_image", ext="mp4")
-    output_video_path = OUTPUTS_DIR / video_filename
+    return image_path, OUTPUTS_DIR / video_filename, duration
 
-    # Try ffmpeg
-    ffmpeg_debug = _run_ffmpeg_still_to_video(
-        input_image=image_path,
-        output_video=output_video_path,
-        duration_seconds=duration,
-    )
 
+def _finish_video_job(
+    image_path: Path,
+    output_video_path: Path,
+    duration: float,
+    camera_motion: str,
+    ffmpeg_debug: Dict[str, Any],
+) -> Dict[str, Any]:
     if not ffmpeg_debug["success"]:
         # Fallback: create an empty placeholder file so the path exists.
         # (This is just a safety net; in normal Docker setup ffmpeg should exist.)
@@ -182,4 +366,4 @@ def generate_video_from_image(
     }
 
 
-__all__ = ["generate_video_from_image"]
+__all__ = ["generate_video_from_image", "generate_video_from_image_async"]
@@ -13,17 +13,28 @@ Right now it does NOT:
 Later (Phase 3), this becomes the real GPU app.
 
 Right now it only:
-- loads SD35Runtime(device="cpu") safely
-- loads PipelineManager
 - exposes a simple API to test dispatching
+- with SD35_RUNTIME_MODE=real, renders text2img jobs through the cached
+  SD35Runtime (runtime.pipeline_manager) and the job batcher
 """
 
+import asyncio
 import os
+import weakref
+from typing import Tuple
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field
 
-from runtime.sd35_runtime import SD35Runtime
-from runtime.pipeline_manager import PipelineManager
+try:
+    import orjson  # type: ignore  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+from runtime.batcher import Text2ImgJobBatcher
+from runtime.executors import DISPATCH_POOL, run_in_pool
+from runtime.pipeline_manager import load_job_meta
 
 
 # -------------------------------------------------------------------
@@ -36,17 +47,41 @@ app = FastAPI(
         "This is the placeholder API for GPU execution. "
         "No GPU, no SD3.5 loading yet — safe for local use."
     ),
-    version="0.1.0-gpu-skeleton"
+    version="0.1.0-gpu-skeleton",
+    # ORJSONResponse needs orjson at render time; stay on stdlib json without it.
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
 )
 
 
 # -------------------------------------------------------------------
-# TEMPORARY: SD35Runtime using CPU only
-# (We switch to device='cuda' later)
+# Runtime
+# (skeleton unless SD35_RUNTIME_MODE=real; the runtime itself is loaded
+# lazily and cached by runtime.pipeline_manager)
 # -------------------------------------------------------------------
 
-runtime = SD35Runtime(device="cpu")
-pipeline_manager = PipelineManager(base_outputs_dir="outputs")
+OUTPUTS_ROOT = "outputs"
+
+_text2img_batcher = (
+    Text2ImgJobBatcher(device=os.getenv("SD_DEVICE", "cuda"))
+    if os.getenv("SD35_RUNTIME_MODE", "skeleton").lower() == "real"
+    else None
+)
+
+# One lock per (date_str, job_id): concurrent dispatches of the same job run
+# one after another instead of racing on its meta.json. Entries disappear
+# once no request holds or waits on the lock.
+_JOB_LOCKS: "weakref.WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _job_lock(date_str: str, job_id: str) -> asyncio.Lock:
+    key = (date_str, job_id)
+    lock = _JOB_LOCKS.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _JOB_LOCKS[key] = lock
+    return lock
 
 
 # -------------------------------------------------------------------
@@ -76,21 +111,21 @@ async def gpu_dispatch(req: GPUJobRequest):
 
     WHAT HAPPENS NOW:
     - Loads meta.json from outputs/{date}/{job_id}
-    - Returns it with a small message
-    - No SD3.5, no GPU, no inference
+    - With SD35_RUNTIME_MODE=real, text2img jobs are rendered through the
+      cached runtime (batched with concurrent same-shape jobs)
+    - Otherwise returns the meta with a small message (no inference)
 
     WHAT WILL HAPPEN LATER:
-    - runtime.load()
-    - choose pipeline (text2img/img2img/etc)
-    - run inference on GPU
-    - write output.png for real
+    - choose pipelines for the other job types (img2img/etc)
     """
+    lock = _job_lock(req.date_str, req.job_id)
     try:
-        result = pipeline_manager.dispatch_job(
-            date_str=req.date_str,
-            job_id=req.job_id,
-            sd35_runtime=runtime
-        )
+        # meta.json I/O is blocking; keep it off the event loop.
+        job_folder = os.path.join(OUTPUTS_ROOT, req.date_str, req.job_id)
+        async with lock:
+            result = await run_in_pool(DISPATCH_POOL, load_job_meta, job_folder)
+            if _text2img_batcher is not None and result.get("type", "text2img") == "text2img":
+                result = await _text2img_batcher.submit(job_folder)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -8,3 +8,5 @@ parts of the codebase can do:
 """
 
 from .sd35_runtime import SD35Runtime, GenerationResult  # noqa: F401
+
+__all__ = ["SD35Runtime", "GenerationResult"]
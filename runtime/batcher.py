@@ -0,0 +1,77 @@
+# runtime/batcher.py
+"""
+Micro-batching of queued text2img jobs for SD35Runtime.
+
+Jobs that arrive within `max_wait_s` of each other (up to `max_batch`) and
+share width / height / steps / guidance scale are rendered by ONE
+SD35Runtime.generate_text2img_batched(...) call instead of one pipeline
+call each. The runtime comes from the pipeline_manager cache and is leased
+per batch. Usage (from async FastAPI code):
+
+    batcher = Text2ImgJobBatcher(device="cuda")
+    meta = await batcher.submit(job_folder)
+"""
+
+import asyncio
+import functools
+from typing import Any, Dict, List, Tuple
+
+from .executors import MicroBatcher
+from .pipeline_manager import (
+    JobStatus,
+    load_job_meta,
+    runtime_lease,
+    save_job_meta,
+    save_job_meta_async,
+    simulate_text2img_render,
+)
+from .sd35_runtime import SD35Runtime
+
+
+def _render_group(device: str, jobs: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Render one same-shape group on the cached runtime for `device`, or
+    simulate it when no real runtime could be loaded.
+    """
+    with runtime_lease(device=device) as runtime:
+        if runtime.mode != "real":
+            return [simulate_text2img_render(job_folder) for job_folder, _ in jobs]
+        metas = runtime.generate_text2img_batched(jobs)
+
+    for (job_folder, _), meta in zip(jobs, metas):
+        save_job_meta(job_folder, meta)
+    return metas
+
+
+class Text2ImgJobBatcher:
+    """
+    Coalesces concurrent text2img job renders into batched runtime calls.
+
+    Each job is marked JobStatus.BATCHED in its meta.json while it waits;
+    the runtime sets the final status when its image is written.
+    """
+
+    def __init__(
+        self,
+        device: str = "cuda",
+        max_batch: int = 4,
+        max_wait_s: float = 0.05,
+    ) -> None:
+        self.device = device
+        # Only same-shape jobs can share a forward pass.
+        self._batcher: MicroBatcher[Tuple[str, Dict[str, Any]], Dict[str, Any]] = MicroBatcher(
+            group_key=lambda job: SD35Runtime.batch_key(job[1]),
+            render=functools.partial(_render_group, device),
+            max_batch=max_batch,
+            max_wait_s=max_wait_s,
+        )
+
+    async def submit(self, job_folder: str) -> Dict[str, Any]:
+        meta = await asyncio.to_thread(load_job_meta, job_folder)
+        meta["status"] = JobStatus.BATCHED.value
+        await save_job_meta_async(job_folder, meta)
+
+        return await self._batcher.submit((job_folder, meta))
+
+
+__all__ = ["Text2ImgJobBatcher"]
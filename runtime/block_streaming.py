@@ -0,0 +1,123 @@
+# runtime/block_streaming.py
+"""
+Per-block weight streaming for the SD3 transformer on small-VRAM GPUs.
+
+Shared by runtime/sd35_runtime.py (SD35Runtime.load) and sd35_loader.py
+(load_sd35_pipeline). Like the rest of the runtime package, torch is never
+imported here; callers pass in the module they already imported.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict
+
+# Below this much VRAM the MM-DiT blocks are streamed from pinned host memory
+# instead of keeping the whole transformer resident.
+# RENDEREXPO_SD35_BLOCK_OFFLOAD=1 / =0 forces it on / off.
+_BLOCK_OFFLOAD_VRAM_BYTES = 40 * 1024**3
+
+
+def should_stream_blocks(device: str, torch: Any) -> bool:
+    """
+    True when `device` is a CUDA device too small to hold SD3.5 Large.
+    """
+    if not (device.startswith("cuda") and torch.cuda.is_available()):
+        return False
+    forced = os.getenv("RENDEREXPO_SD35_BLOCK_OFFLOAD")
+    if forced is not None:
+        return forced == "1"
+    total = torch.cuda.get_device_properties(torch.device(device)).total_memory
+    return total < _BLOCK_OFFLOAD_VRAM_BYTES
+
+
+def place_pipeline_for_streaming(pipe: Any, device: str, torch: Any) -> "TransformerBlockStreamer":
+    """
+    Move every pipeline component except the transformer blocks to `device`
+    (text encoders and VAE are small and reused every call) and start
+    streaming the blocks. The blocks' hooks hold the returned streamer.
+    """
+    for name, component in pipe.components.items():
+        if name == "transformer" or not hasattr(component, "to"):
+            continue
+        if getattr(component, "is_loaded_in_8bit", False):
+            continue  # bitsandbytes models are placed at load and cannot move
+        component.to(device)
+    return TransformerBlockStreamer(pipe.transformer, device, torch)
+
+
+class TransformerBlockStreamer:
+    """
+    Per-block CPU -> GPU weight streaming for the SD3 transformer.
+
+    Every JointTransformerBlock keeps its weights in pinned host memory.
+    A forward pre-hook waits for the block's weights (issuing the copy if it
+    was not prefetched) and immediately starts copying the next block on a
+    separate copy stream, so block i+1 crosses PCIe while block i computes.
+    The post-hook drops the GPU copies; the pinned host tensors stay the
+    source of truth, so nothing is copied back.
+    """
+
+    def __init__(self, transformer: Any, device: str, torch: Any) -> None:
+        self._torch = torch
+        self._device = torch.device(device)
+        self._copy_stream = torch.cuda.Stream()
+        self._blocks = list(transformer.transformer_blocks)
+        self._host: Dict[int, list] = {}
+        self._ready: Dict[int, Any] = {}
+
+        # Everything outside the blocks (embeddings, norms, proj_out) is small
+        # and stays resident.
+        for name, child in transformer.named_children():
+            if name != "transformer_blocks":
+                child.to(self._device)
+
+        for index, block in enumerate(self._blocks):
+            tensors = [*block.parameters(), *block.buffers()]
+            for tensor in tensors:
+                tensor.data = tensor.data.pin_memory()
+            self._host[index] = [(tensor, tensor.data) for tensor in tensors]
+            block.register_forward_pre_hook(self._make_pre_hook(index))
+            block.register_forward_hook(self._make_post_hook(index))
+
+    def _prefetch(self, index: int) -> None:
+        if index in self._ready:
+            return
+        torch = self._torch
+        with torch.cuda.stream(self._copy_stream):
+            for tensor, host in self._host[index]:
+                tensor.data = host.to(self._device, non_blocking=True)
+            event = torch.cuda.Event()
+            event.record(self._copy_stream)
+        self._ready[index] = event
+
+    def _make_pre_hook(self, index: int):
+        def hook(module: Any, args: Any) -> None:
+            torch = self._torch
+            self._prefetch(index)
+            compute_stream = torch.cuda.current_stream()
+            compute_stream.wait_event(self._ready.pop(index))
+            # The GPU copies were allocated on the copy stream; tell the
+            # caching allocator they are in use on the compute stream too.
+            for tensor, _ in self._host[index]:
+                tensor.data.record_stream(compute_stream)
+            # Wrap around so the first block is ready for the next step.
+            self._prefetch((index + 1) % len(self._blocks))
+
+        return hook
+
+    def _make_post_hook(self, index: int):
+        def hook(module: Any, args: Any, output: Any) -> None:
+            if index in self._ready:  # single-block model: already re-fetched
+                return
+            for tensor, host in self._host[index]:
+                tensor.data = host
+
+        return hook
+
+
+__all__ = [
+    "TransformerBlockStreamer",
+    "place_pipeline_for_streaming",
+    "should_stream_blocks",
+]
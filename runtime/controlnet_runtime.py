@@ -11,9 +11,15 @@ IMPORTANT:
 
 from __future__ import annotations
 
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Dict, Any, Optional
 
+logger = logging.getLogger(__name__)
+
 
 # Allowed control types we plan to support
 ALLOWED_CONTROL_TYPES = [
@@ -26,6 +32,11 @@ ALLOWED_CONTROL_TYPES = [
 ]
 
 
+# How many ControlNets are read from disk ahead of the one being copied to
+# the GPU.
+_READ_AHEAD = 2
+
+
 @dataclass
 class ControlNetConfig:
     """
@@ -33,22 +44,26 @@ class ControlNetConfig:
     """
     device: str = "cuda"
     dtype: str = "float16"
+    # One diffusers ControlNet folder per control type: <models_dir>/<type>/
+    models_dir: str = os.getenv("CONTROLNET_MODELS_DIR", "/workspace/models/controlnet")
 
 
 class ControlNetRuntime:
     """
-    Skeleton runtime wrapper for ControlNet.
+    Runtime wrapper for ControlNet.
+
+    On CUDA (GPU / RunPod):
+    - load() loads the ControlNet models found under config.models_dir.
+    - Inference is NOT implemented yet (apply_control raises).
 
     For NOW (local CPU):
     - We DO NOT load any real ControlNet weights.
-    - We DO NOT run inference.
     - We only exist so the PipelineManager can reference ControlNetRuntime
       without crashing.
 
     Later (on GPU / RunPod):
     - This class will:
-        * load specific ControlNet models
-        * apply them to SD3.5 pipelines
+        * apply the loaded models to SD3.5 pipelines
         * support sketch, floorplan, canny, lineart, depth, etc.
     """
 
@@ -60,22 +75,84 @@ class ControlNetRuntime:
 
     def load(self) -> None:
         """
-        Placeholder load method.
+        Load the ControlNet models found under config.models_dir.
 
-        In the GPU version, this would:
-        - Load specific ControlNet models from disk or Hugging Face.
-        - Move them to the correct device (cuda).
-        - Possibly wrap them in a diffusers pipeline.
+        On CUDA:
+        - Up to _READ_AHEAD models are read from disk into pinned host memory
+          on worker threads while the previous one is copied to the GPU on a
+          dedicated stream (non_blocking), so disk reads overlap PCIe copies.
+        - is_loaded is only set once every copy has finished.
+        - Control types without a folder are skipped; if torch/diffusers are
+          missing, nothing is loaded and is_loaded stays False.
 
         On LOCAL (CPU) dev:
         - DO NOT load anything.
         - Just mark as 'loaded' so other code doesn't break.
         """
-        # In the future, we might do something like:
-        #   from diffusers import ControlNetModel
-        #   self.models["canny"] = ControlNetModel.from_pretrained(...)
-        #
-        # But for now: no-op
+        if not self.device.startswith("cuda"):
+            self.is_loaded = True
+            return
+
+        try:
+            import torch  # type: ignore
+            from diffusers import ControlNetModel  # type: ignore
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Failed to import torch/diffusers for ControlNet runtime: %s", exc)
+            return
+
+        dtype = getattr(torch, self.config.dtype)
+        paths = [
+            (control_type, os.path.join(self.config.models_dir, control_type))
+            for control_type in ALLOWED_CONTROL_TYPES
+            if os.path.isdir(os.path.join(self.config.models_dir, control_type))
+        ]
+
+        def _read(path: str) -> Any:
+            # Disk -> pinned host memory, so the H2D copy can be async.
+            model = ControlNetModel.from_pretrained(path, torch_dtype=dtype).eval()
+            for tensor in (*model.parameters(), *model.buffers()):
+                tensor.data = tensor.data.pin_memory()
+            return model
+
+        copy_stream = torch.cuda.Stream()
+        events = []
+        pending: deque = deque()
+        remaining = iter(paths)
+
+        with ThreadPoolExecutor(max_workers=_READ_AHEAD, thread_name_prefix="controlnet-load") as pool:
+
+            def _submit_next() -> None:
+                item = next(remaining, None)
+                if item is not None:
+                    control_type, path = item
+                    pending.append((control_type, pool.submit(_read, path)))
+
+            for _ in range(_READ_AHEAD):
+                _submit_next()
+
+            while pending:
+                control_type, future = pending.popleft()
+                _submit_next()
+                try:
+                    model = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("Failed to load ControlNet '%s': %s", control_type, exc)
+                    continue
+
+                with torch.cuda.stream(copy_stream):
+                    model.to(self.device, non_blocking=True)
+                    event = torch.cuda.Event()
+                    event.record(copy_stream)
+                events.append(event)
+                self.models[control_type] = model
+                logger.info("ControlNet '%s' queued for %s.", control_type, self.device)
+
+        for event in events:
+            event.synchronize()
+        # Later work on the default stream must see the copied weights.
+        torch.cuda.current_stream().wait_stream(copy_stream)
+
+        logger.info("ControlNetRuntime loaded: %s", sorted(self.models))
         self.is_loaded = True
 
     def is_ready(self) -> bool:
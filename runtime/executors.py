@@ -0,0 +1,148 @@
+# runtime/executors.py
+"""
+Shared executors for blocking work called from FastAPI handlers.
+
+Async route handlers must not call synchronous file I/O, PNG encodes or
+subprocesses directly: that blocks the event loop and serializes every
+request on the worker. Instead they do:
+
+    result = await run_in_pool(DISPATCH_POOL, fn, *args, **kwargs)
+
+Batched GPU calls go through a MicroBatcher, which coalesces concurrent
+submissions into one blocking call per group.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Job dispatch (meta.json I/O, image writes, inference calls). Threads are
+# enough: PIL encode/decode and torch kernels release the GIL.
+DISPATCH_POOL = ThreadPoolExecutor(
+    max_workers=max(2, (os.cpu_count() or 2) // 2),
+    thread_name_prefix="dispatch",
+)
+
+
+async def run_in_pool(pool: Executor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run fn(*args, **kwargs) on `pool` and await the result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesces concurrent async submissions into batched blocking calls.
+
+    Items queued within `max_wait_s` of the first one (up to `max_batch`)
+    are split into groups of equal group_key(item); each group is passed to
+    render(items) in a worker thread, which must return one result per item
+    in the same order. Each submit() resolves to its own result, or raises
+    the group's exception.
+
+    The queue and worker task belong to the event loop that first submits.
+    """
+
+    def __init__(
+        self,
+        group_key: Callable[[T], Any],
+        render: Callable[[List[T]], List[R]],
+        max_batch: int = 4,
+        max_wait_s: float = 0.05,
+    ) -> None:
+        self.group_key = group_key
+        self.render = render
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            # First use, or the worker died: queued items are picked up again.
+            self._worker = loop.create_task(self._serve())
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[T, asyncio.Future]]:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _serve(self) -> None:
+        while True:
+            batch = await self._collect()
+
+            # Compared with ==, so keys need not be hashable (e.g. param dicts).
+            groups: List[Tuple[Any, List[Tuple[T, asyncio.Future]]]] = []
+            for item, future in batch:
+                try:
+                    key = self.group_key(item)
+                    for group_key, members in groups:
+                        if group_key == key:
+                            members.append((item, future))
+                            break
+                    else:
+                        groups.append((key, [(item, future)]))
+                except Exception as e:  # noqa: BLE001 - fail only this item
+                    if not future.done():
+                        future.set_exception(e)
+
+            for _, members in groups:
+                await self._run_group(members)
+
+    async def _run_group(self, members: List[Tuple[T, asyncio.Future]]) -> None:
+        items = [item for item, _ in members]
+        try:
+            results = await asyncio.to_thread(self.render, items)
+        except Exception as e:  # noqa: BLE001 - propagate to every waiter
+            logger.exception("Batched call of %d items failed.", len(items))
+            for _, future in members:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(members, results):
+            if not future.done():
+                future.set_result(result)
+
+        if len(results) < len(members):
+            missing = RuntimeError(
+                f"Batched call returned {len(results)} results for {len(members)} items."
+            )
+            for _, future in members[len(results):]:
+                if not future.done():
+                    future.set_exception(missing)
+
+
+__all__ = [
+    "DISPATCH_POOL",
+    "MicroBatcher",
+    "run_in_pool",
+]
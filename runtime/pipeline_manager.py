@@ -3,23 +3,40 @@
 Pipeline manager for SD3.5 jobs (skeleton version).
 
 IMPORTANT:
-- This file does NOT load SD3.5.
-- It does NOT run real inference.
+- This file does NOT load SD3.5 by itself.
 - It ONLY:
     * reads/writes meta.json
     * plans text2img actions
     * can simulate a "render" by writing a dummy PNG
+    * hands real renders to a cached SD35Runtime (render_text2img)
 """
 
+import asyncio
+import io
 import os
 import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional, Tuple
 
 from PIL import Image
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+from .executors import DISPATCH_POOL
+from .sd35_runtime import SD35Runtime
+
+logger = logging.getLogger(__name__)
+
 
 # ---------------------------------------------------------------------------
 # Data structures
@@ -27,6 +44,7 @@ from PIL import Image
 
 class JobStatus(str, Enum):
     PLANNED = "planned"
+    BATCHED = "batched"
     DISPATCHED = "dispatched_skeleton"
     COMPLETED = "completed_skeleton"
 
@@ -47,28 +65,286 @@ def _meta_path(job_folder: str) -> str:
     return os.path.join(job_folder, "meta.json")
 
 
-def load_job_meta(job_folder: str) -> Dict[str, Any]:
-    """
-    Load meta.json from a job folder.
+# Opt-in (RENDEREXPO_META_SHM=1): meta.json is written to a mirror under
+# /dev/shm first and to the job folder by a background flush, so a
+# load -> mutate -> save round trip never waits on the disk. The mirror only
+# exists while a flush is pending and load_job_meta() prefers it; anything
+# that reads or writes meta.json directly (app/routers/*) can see a stale
+# file or lose a write in that window, so only enable this on workers where
+# every meta.json access goes through this module.
+_SHM_ROOT = "/dev/shm/renderexpo"
+_META_SHM_ENABLED = (
+    os.environ.get("RENDEREXPO_META_SHM") == "1" and os.path.isdir("/dev/shm")
+)
 
-    Raises FileNotFoundError if meta.json is missing.
+# One worker, so flushes land on disk in submission order.
+_META_FLUSH_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="meta-flush")
+
+# job folder -> version of its latest save_job_meta(); a flush only writes
+# (and removes the mirror) if no newer save happened since it was queued.
+_META_VERSIONS: Dict[str, int] = {}
+_META_VERSIONS_LOCK = threading.Lock()
+
+
+def _shm_meta_path(job_folder: str) -> str:
+    return os.path.join(_SHM_ROOT, os.path.abspath(job_folder).lstrip(os.sep), "meta.json")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _flush_meta(job_folder: str, version: int, data: bytes) -> None:
+    """
+    Write one queued meta.json version to the job folder, then drop the
+    /dev/shm mirror if that version is still the latest.
     """
+    key = os.path.abspath(job_folder)
+    with _META_VERSIONS_LOCK:
+        if _META_VERSIONS.get(key) != version:
+            return  # a newer save is queued behind this one
+
+    try:
+        _write_atomic(_meta_path(job_folder), data)
+    except OSError:
+        logger.exception("Failed to flush meta.json for %s", job_folder)
+        return
+
+    with _META_VERSIONS_LOCK:
+        if _META_VERSIONS.get(key) != version:
+            return
+        del _META_VERSIONS[key]
+        try:
+            os.unlink(_shm_meta_path(job_folder))
+        except OSError:
+            pass
+
+
+def _read_meta_bytes(job_folder: str) -> bytes:
+    if _META_SHM_ENABLED:
+        try:
+            with open(_shm_meta_path(job_folder), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass  # nothing pending; the job folder is current
+
     path = _meta_path(job_folder)
     if not os.path.isfile(path):
         raise FileNotFoundError(f"meta.json not found in job folder: {job_folder}")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_job_meta(job_folder: str) -> Dict[str, Any]:
+    """
+    Load meta.json from a job folder (or its /dev/shm mirror).
 
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    Raises FileNotFoundError if meta.json is missing.
+    """
+    data = _read_meta_bytes(job_folder)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def save_job_meta(job_folder: str, meta: Dict[str, Any]) -> None:
     """
     Save meta.json to a job folder.
+
+    With RENDEREXPO_META_SHM=1 the disk write happens in the background;
+    load_job_meta() sees the new contents immediately.
     """
     os.makedirs(job_folder, exist_ok=True)
-    path = _meta_path(job_folder)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(meta, f, indent=2)
+    if orjson is not None:
+        data = orjson.dumps(meta, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(meta, indent=2).encode("utf-8")
+
+    if _META_SHM_ENABLED:
+        key = os.path.abspath(job_folder)
+        shm_path = _shm_meta_path(job_folder)
+        # Held across the mirror write so a finishing flush cannot unlink
+        # the mirror between this write and the version bump.
+        with _META_VERSIONS_LOCK:
+            try:
+                os.makedirs(os.path.dirname(shm_path), exist_ok=True)
+                _write_atomic(shm_path, data)
+            except OSError:
+                logger.exception(
+                    "Failed to write meta.json mirror for %s; writing to disk.", job_folder
+                )
+                # Cancel any queued flush and drop the older mirror so it
+                # cannot shadow or overwrite the disk write below.
+                _META_VERSIONS.pop(key, None)
+                try:
+                    os.unlink(shm_path)
+                except OSError:
+                    pass
+            else:
+                version = _META_VERSIONS.get(key, 0) + 1
+                _META_VERSIONS[key] = version
+                _META_FLUSH_POOL.submit(_flush_meta, job_folder, version, data)
+                return
+
+    _write_atomic(_meta_path(job_folder), data)
+
+
+async def save_job_meta_async(job_folder: str, meta: Dict[str, Any]) -> None:
+    """
+    save_job_meta for async callers. The mirror write is a memcpy-sized
+    write to tmpfs, so it runs inline; without the mirror the disk write
+    goes to a thread.
+    """
+    if _META_SHM_ENABLED:
+        save_job_meta(job_folder, meta)
+    else:
+        await asyncio.to_thread(save_job_meta, job_folder, meta)
+
+
+# ---------------------------------------------------------------------------
+# Runtime cache
+# ---------------------------------------------------------------------------
+
+# Loaded runtimes keyed by (model_path, device, dtype), most recent last.
+# Runtimes stay loaded between jobs; older ones are only unloaded when the
+# GPU runs short of free memory before another runtime is loaded, and never
+# while a caller holds them through runtime_lease().
+_RUNTIME_CACHE: "OrderedDict[Tuple[str, str, str], SD35Runtime]" = OrderedDict()
+_RUNTIME_USERS: Dict[Tuple[str, str, str], int] = {}
+_RUNTIME_LOCK = threading.RLock()
+# Key of the most recent real runtime_lease(): the runtime the renderer uses.
+_LAST_LEASED_KEY: Optional[Tuple[str, str, str]] = None
+
+# Free VRAM required before loading another runtime.
+_MIN_FREE_VRAM_BYTES = int(
+    float(os.getenv("RENDEREXPO_RUNTIME_MIN_FREE_VRAM_GB", "4")) * 1024**3
+)
+
+
+def _runtime_key(model_path: Optional[str], device: str, dtype: str) -> Tuple[str, str, str]:
+    model_path = model_path or os.getenv("SD35_MODEL_PATH", "/workspace/models/sd35-large")
+    return (model_path, device, dtype)
+
+
+def _free_vram_bytes(device: str) -> int:
+    """
+    Free memory on `device`, or -1 if it is not a usable CUDA device.
+    """
+    if not device.startswith("cuda"):
+        return -1
+    try:
+        import torch  # type: ignore
+    except ImportError:
+        return -1
+    if not torch.cuda.is_available():
+        return -1
+    return torch.cuda.mem_get_info(torch.device(device))[0]
+
+
+def _evict_for(device: str) -> None:
+    """
+    Unload least-recently-used idle runtimes until `device` has enough free
+    VRAM. Runtimes with an active lease are skipped. Caller holds
+    _RUNTIME_LOCK.
+    """
+    for key in list(_RUNTIME_CACHE):
+        free = _free_vram_bytes(device)
+        if free < 0 or free >= _MIN_FREE_VRAM_BYTES:
+            return
+        if _RUNTIME_USERS.get(key):
+            continue
+        runtime = _RUNTIME_CACHE.pop(key)
+        logger.info("Unloading cached runtime %s (free VRAM %.1f GB).", key, free / 1024**3)
+        runtime.unload()
+
+
+def get_runtime(
+    device: str = "cuda",
+    model_path: Optional[str] = None,
+    dtype: str = "float16",
+    mode: str = "real",
+) -> SD35Runtime:
+    """
+    Return a loaded SD35Runtime for (model_path, device, dtype), loading it
+    on first use. Later jobs reuse the same instance instead of reloading.
+
+    A runtime whose load failed (it fell back to skeleton mode) is returned
+    but not cached, so the next call tries again. Hold the runtime with
+    runtime_lease() while using it, or it may be evicted.
+    """
+    key = _runtime_key(model_path, device, dtype)
+    with _RUNTIME_LOCK:
+        runtime = _RUNTIME_CACHE.get(key)
+        if runtime is not None:
+            _RUNTIME_CACHE.move_to_end(key)
+            return runtime
+
+        _evict_for(device)
+        runtime = SD35Runtime(mode=mode, device=device, model_path=key[0], dtype=dtype)
+        runtime.load()
+        if runtime.mode == mode:
+            _RUNTIME_CACHE[key] = runtime
+        return runtime
+
+
+@contextmanager
+def runtime_lease(
+    device: str = "cuda",
+    model_path: Optional[str] = None,
+    dtype: str = "float16",
+) -> Iterator[SD35Runtime]:
+    """
+    get_runtime(...) that keeps the runtime from being evicted until the
+    with-block exits.
+    """
+    global _LAST_LEASED_KEY
+
+    key = _runtime_key(model_path, device, dtype)
+    with _RUNTIME_LOCK:
+        runtime = get_runtime(device=device, model_path=model_path, dtype=dtype)
+        _RUNTIME_USERS[key] = _RUNTIME_USERS.get(key, 0) + 1
+        if runtime.mode == "real":
+            _LAST_LEASED_KEY = key
+    try:
+        yield runtime
+    finally:
+        with _RUNTIME_LOCK:
+            users = _RUNTIME_USERS.pop(key) - 1
+            if users:
+                _RUNTIME_USERS[key] = users
+
+
+def unload_runtimes() -> None:
+    """
+    Unload and forget every cached runtime (process shutdown).
+    """
+    with _RUNTIME_LOCK:
+        while _RUNTIME_CACHE:
+            _, runtime = _RUNTIME_CACHE.popitem()
+            runtime.unload()
+
+
+def prefetch_runtime() -> None:
+    """
+    Start reloading, in the background, the runtime the renderer last
+    leased if it has since been evicted, so the next render does not wait
+    for it.
+
+    Does nothing until something has rendered in this process (so
+    skeleton/CPU setups never start a load just by planning), or while
+    that runtime is still cached. get_runtime's lock keeps this from
+    double-loading if the render request arrives mid-load.
+    """
+    with _RUNTIME_LOCK:
+        key = _LAST_LEASED_KEY
+        if key is None or key in _RUNTIME_CACHE:
+            return
+    model_path, device, dtype = key
+    logger.info("Prefetching evicted runtime for planned job: device=%s", device)
+    DISPATCH_POOL.submit(get_runtime, device=device, model_path=model_path, dtype=dtype)
 
 
 # ---------------------------------------------------------------------------
@@ -138,6 +414,9 @@ def make_text2img_plan_for_job(job_folder: str) -> Dict[str, Any]:
     # We leave meta["status"] as-is ("planned") for now
 
     save_job_meta(job_folder, meta)
+
+    # Warm the model for the render request that follows the plan.
+    prefetch_runtime()
     return meta
 
 
@@ -145,6 +424,26 @@ def make_text2img_plan_for_job(job_folder: str) -> Dict[str, Any]:
 # Simulated "render" helpers (still no real AI)
 # ---------------------------------------------------------------------------
 
+_DUMMY_GRAY = 32
+
+# Encoded dummy PNGs keyed by (width, height, gray level). Every simulated
+# render at the same size writes identical bytes, so encode once.
+_DUMMY_PNG_CACHE: Dict[Tuple[int, int, int], bytes] = {}
+_DUMMY_PNG_LOCK = threading.Lock()
+
+
+def _dummy_png_bytes(width: int, height: int, gray: int = _DUMMY_GRAY) -> bytes:
+    key = (width, height, gray)
+    with _DUMMY_PNG_LOCK:
+        data = _DUMMY_PNG_CACHE.get(key)
+        if data is None:
+            buf = io.BytesIO()
+            Image.new("RGB", (width, height), (gray, gray, gray)).save(
+                buf, format="PNG", compress_level=1
+            )
+            data = _DUMMY_PNG_CACHE[key] = buf.getvalue()
+    return data
+
 def simulate_text2img_render(job_folder: str) -> Dict[str, Any]:
     """
     Simulate a text2img GPU render by:
@@ -176,9 +475,9 @@ def simulate_text2img_render(job_folder: str) -> Dict[str, Any]:
     width = int(meta.get("width", 1024))
     height = int(meta.get("height", 1024))
 
-    # Create a very simple dummy image (dark gray)
-    img = Image.new("RGB", (width, height), (32, 32, 32))
-    img.save(out_path)
+    # Write a very simple dummy image (dark gray)
+    with open(out_path, "wb") as f:
+        f.write(_dummy_png_bytes(width, height))
 
     # Update meta
     meta["status"] = JobStatus.COMPLETED.value
@@ -189,3 +488,29 @@ def simulate_text2img_render(job_folder: str) -> Dict[str, Any]:
 
     save_job_meta(job_folder, meta)
     return meta
+
+
+# ---------------------------------------------------------------------------
+# Real render
+# ---------------------------------------------------------------------------
+
+def render_text2img(job_folder: str, device: str = "cuda") -> Dict[str, Any]:
+    """
+    Render a text2img job with the cached SD35Runtime.
+
+    Falls back to simulate_text2img_render() when the runtime could not
+    load (it stays in skeleton mode).
+    """
+    meta = load_job_meta(job_folder)
+
+    job_type = meta.get("type", "text2img")
+    if job_type != "text2img":
+        raise ValueError(f"render_text2img only supports text2img, got: {job_type}")
+
+    with runtime_lease(device=device) as runtime:
+        if runtime.mode != "real":
+            return simulate_text2img_render(job_folder)
+        meta = runtime.generate_text2img(job_folder, meta)
+
+    save_job_meta(job_folder, meta)
+    return meta
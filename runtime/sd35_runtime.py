@@ -22,12 +22,32 @@ from __future__ import annotations
 
 import os
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from .block_streaming import (
+    TransformerBlockStreamer,
+    place_pipeline_for_streaming,
+    should_stream_blocks,
+)
 
 logger = logging.getLogger(__name__)
 
+# Set SD35_TORCH_COMPILE=0 to skip torch.compile (e.g. for quick debug pods).
+_TORCH_COMPILE_ENABLED = os.environ.get("SD35_TORCH_COMPILE", "1") != "0"
+
+# Resolution the denoising graph is captured at during load().
+_WARMUP_RESOLUTION = (1024, 1024)
+
+# Denoising steps run at load(). cudagraph trees run the first call of a
+# shape eagerly (warm-up) and record on a later one, so one step is not
+# enough to have a graph before the first job.
+_WARMUP_STEPS = 3
+
 
 @dataclass
 class GenerationResult:
@@ -48,17 +68,39 @@ class SD35Runtime:
     Attributes:
         mode: "skeleton" or "real".
         device: "cuda" (GPU) or "cpu" (for testing).
-        model_path: Filesystem location of the SD3.5 model weights.
+        model_path: Filesystem location of the SD3.5 model weights
+            (default: $SD35_MODEL_PATH).
+        dtype: Weight dtype name ("float16" or "bfloat16").
         pipe: The diffusers pipeline instance when in real mode.
     """
 
-    def __init__(self, mode: str = "skeleton", device: str = "cuda") -> None:
+    def __init__(
+        self,
+        mode: str = "skeleton",
+        device: str = "cuda",
+        model_path: Optional[str] = None,
+        dtype: str = "float16",
+    ) -> None:
         self.mode = mode
         self.device = device
-        self.model_path = os.getenv("SD35_MODEL_PATH", "/workspace/models/sd35-large")
+        self.model_path = model_path or os.getenv("SD35_MODEL_PATH", "/workspace/models/sd35-large")
+        self.dtype = dtype
 
         self.pipe: Optional[Any] = None
         self._torch: Optional[Any] = None
+        # Dedicated CUDA stream for denoising (created in load() on CUDA).
+        self._stream: Optional[Any] = None
+        # Every pipeline call (including the load-time warm-up) runs on this
+        # one thread: cudagraph trees keep graphs and their memory pool per
+        # thread, so calls from DISPATCH_POOL / asyncio.to_thread workers
+        # would each re-warm and re-record. One worker also serializes calls.
+        self._pipe_executor = self._new_pipe_executor()
+        self._block_streamer: Optional[TransformerBlockStreamer] = None
+        # Reused torch.Generators keyed by batch slot; re-seeded per job
+        # instead of allocating new Philox state every call. Per thread: the
+        # runtime is shared across DISPATCH_POOL threads, and a shared
+        # generator could be re-seeded by another job before this one draws.
+        self._gen_local = threading.local()
 
         logger.info(
             "SD35Runtime initialized with mode=%s, device=%s, model_path=%s",
@@ -94,6 +136,13 @@ class SD35Runtime:
 
         self._torch = torch
 
+        if self.device.startswith("cuda") and torch.cuda.is_available():
+            # TF32 matmuls/convs on Ampere+; no effect on older cards.
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.backends.cudnn.benchmark = True
+            self._stream = torch.cuda.Stream()
+
         if not os.path.isdir(self.model_path):
             logger.error(
                 "SD3.5 model path does not exist: %s. "
@@ -108,15 +157,34 @@ class SD35Runtime:
             logger.info("Loading SD3.5 model from %s ...", self.model_path)
             pipe = StableDiffusion3Pipeline.from_pretrained(
                 self.model_path,
-                torch_dtype=torch.float16,
-            ).to(self.device)
+                torch_dtype=getattr(torch, self.dtype),
+            )
 
-            # Try some memory-friendly options if available
-            try:
-                pipe.enable_model_cpu_offload()
-                logger.info("Enabled model CPU offload for SD3.5 pipeline.")
-            except Exception:
-                logger.info("Model CPU offload not available; continuing without it.")
+            if should_stream_blocks(self.device, torch):
+                # Small-VRAM pod: everything but the MM-DiT blocks goes to the
+                # GPU; the blocks stream in one at a time.
+                self._block_streamer = place_pipeline_for_streaming(pipe, self.device, torch)
+                logger.info("Streaming SD3.5 transformer blocks from pinned host memory.")
+            elif self.device.startswith("cuda") and torch.cuda.is_available():
+                # Enough VRAM: keep everything resident and replay the
+                # transformer step as a CUDA graph.
+                pipe = pipe.to(self.device)
+                self._capture_step_graph(pipe, torch)
+            else:
+                pipe = pipe.to(self.device)
+
+                # Try some memory-friendly options if available
+                try:
+                    pipe.enable_model_cpu_offload()
+                    logger.info("Enabled model CPU offload for SD3.5 pipeline.")
+                except Exception:
+                    logger.info("Model CPU offload not available; continuing without it.")
+
+            # Tiled VAE decode keeps 1024x1024 outputs within 12-16 GB;
+            # slicing decodes batched jobs one image at a time (no effect on
+            # single-image calls). Set once here, never toggled per call.
+            pipe.vae.enable_tiling()
+            pipe.vae.enable_slicing()
 
             self.pipe = pipe
             logger.info("SD35Runtime successfully loaded SD3.5 model.")
@@ -125,6 +193,37 @@ class SD35Runtime:
             self.mode = "skeleton"
             self.pipe = None
 
+    def _capture_step_graph(self, pipe: Any, torch: Any) -> None:
+        """
+        Compile the transformer with mode="reduce-overhead" and run a few
+        warm-up steps (_WARMUP_STEPS) so its CUDA graph is recorded before
+        the first job.
+
+        Every denoising step at a captured shape is then one graph replay
+        instead of hundreds of kernel launches; inductor manages the static
+        input buffers and re-records for new shapes (width/height/batch).
+        Weights must stay resident, so this is skipped with block streaming.
+        """
+        if not _TORCH_COMPILE_ENABLED:
+            return
+
+        pipe.transformer = torch.compile(pipe.transformer, mode="reduce-overhead")
+
+        width, height = _WARMUP_RESOLUTION
+        logger.info("Capturing SD3.5 denoising graph at %sx%s ...", width, height)
+
+        def _warmup() -> None:
+            stream_ctx = torch.cuda.stream(self._stream) if self._stream is not None else nullcontext()
+            with torch.inference_mode(), stream_ctx:
+                pipe(prompt="warmup", width=width, height=height, num_inference_steps=_WARMUP_STEPS)
+
+        # Record on the pipe thread so generate_* calls replay this graph.
+        self._pipe_executor.submit(_warmup).result()
+
+    @staticmethod
+    def _new_pipe_executor() -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="sd35-pipe")
+
     def unload(self) -> None:
         """
         Release model and GPU memory.
@@ -132,6 +231,12 @@ class SD35Runtime:
         logger.info("Unloading SD35Runtime ...")
         if self.pipe is not None:
             self.pipe = None
+        self._stream = None
+        self._block_streamer = None
+        self._gen_local = threading.local()
+        # Let the pipe thread exit; a later load() gets a fresh one.
+        self._pipe_executor.shutdown(wait=True)
+        self._pipe_executor = self._new_pipe_executor()
 
         if self._torch is not None:
             try:
@@ -166,8 +271,6 @@ class SD35Runtime:
                 "or model is not loaded."
             )
 
-        torch = self._torch
-
         prompt = meta.get("prompt") or ""
         negative_prompt = meta.get("negative_prompt") or None
 
@@ -180,7 +283,7 @@ class SD35Runtime:
         generator = None
         if seed is not None:
             try:
-                generator = torch.Generator(device=self.device).manual_seed(int(seed))
+                generator = self._generator(0).manual_seed(int(seed))
             except Exception as exc:  # noqa: BLE001
                 logger.warning("Failed to set SD3.5 generator seed %s: %s", seed, exc)
                 generator = None
@@ -206,12 +309,117 @@ class SD35Runtime:
         if generator is not None:
             generate_kwargs["generator"] = generator
 
-        images = self.pipe(**generate_kwargs).images
+        images = self._run_pipe(generate_kwargs)
         if not images:
             raise RuntimeError("SD3.5 pipeline returned no images.")
 
-        image = images[0]
+        return self._finish_job(job_folder, meta, images[0])
+
+    @staticmethod
+    def batch_key(meta: Dict[str, Any]) -> Tuple[int, int, int, float]:
+        """
+        Jobs with the same key can share one batched pipeline call.
+        """
+        return (
+            int(meta.get("width", 1024)),
+            int(meta.get("height", 1024)),
+            int(meta.get("num_inference_steps", 25)),
+            float(meta.get("guidance_scale", 7.0)),
+        )
+
+    def generate_text2img_batched(
+        self, jobs: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several text2img jobs that share batch_key() in ONE pipeline call
+        (list-valued prompt / negative_prompt / generator) and write each
+        image to its own job folder.
+
+        Args:
+            jobs: (job_folder, meta) pairs, all with the same batch_key().
 
+        Returns:
+            The updated meta dicts, in the same order as `jobs`.
+        """
+        if self.mode != "real" or self.pipe is None or self._torch is None:
+            raise RuntimeError(
+                "SD35Runtime.generate_text2img_batched() called but runtime is not in "
+                "real mode or model is not loaded."
+            )
+        keys = {self.batch_key(meta) for _, meta in jobs}
+        if len(keys) != 1:
+            raise ValueError(f"Batched jobs must share width/height/steps/scale, got {keys}")
+
+        width, height, num_steps, guidance_scale = keys.pop()
+        metas = [meta for _, meta in jobs]
+
+        negative_prompts = [meta.get("negative_prompt") or "" for meta in metas]
+        seeds = [meta.get("seed") for meta in metas]
+
+        generate_kwargs: Dict[str, Any] = {
+            "prompt": [meta.get("prompt") or "" for meta in metas],
+            "negative_prompt": negative_prompts if any(negative_prompts) else None,
+            "num_inference_steps": num_steps,
+            "guidance_scale": guidance_scale,
+            "width": width,
+            "height": height,
+        }
+        if any(seed is not None for seed in seeds):
+            # One generator per image; unseeded jobs get a random seed.
+            generators = []
+            for slot, seed in enumerate(seeds):
+                generator = self._generator(slot)
+                if seed is None:
+                    generator.seed()
+                else:
+                    generator.manual_seed(int(seed))
+                generators.append(generator)
+            generate_kwargs["generator"] = generators
+
+        logger.info(
+            "Running batched SD3.5 text2img: %d jobs, width=%d, height=%d, steps=%d, scale=%.2f",
+            len(jobs),
+            width,
+            height,
+            num_steps,
+            guidance_scale,
+        )
+
+        images = self._run_pipe(generate_kwargs)
+        if len(images) != len(jobs):
+            raise RuntimeError(
+                f"SD3.5 pipeline returned {len(images)} images for {len(jobs)} jobs."
+            )
+
+        return [
+            self._finish_job(job_folder, meta, image)
+            for (job_folder, meta), image in zip(jobs, images)
+        ]
+
+    def _generator(self, slot: int) -> Any:
+        pool: Optional[Dict[int, Any]] = getattr(self._gen_local, "pool", None)
+        if pool is None:
+            pool = self._gen_local.pool = {}
+        generator = pool.get(slot)
+        if generator is None:
+            generator = pool[slot] = self._torch.Generator(device=self.device)
+        return generator
+
+    def _run_pipe(self, generate_kwargs: Dict[str, Any]) -> List[Any]:
+        return self._pipe_executor.submit(self._call_pipe, generate_kwargs).result()
+
+    def _call_pipe(self, generate_kwargs: Dict[str, Any]) -> List[Any]:
+        # Runs on the pipe thread only (see _run_pipe).
+        torch = self._torch
+        stream_ctx = torch.cuda.stream(self._stream) if self._stream is not None else nullcontext()
+        with stream_ctx:
+            images = self.pipe(**generate_kwargs).images
+        if self._stream is not None:
+            # Order the host-side save after the denoise stream's work.
+            torch.cuda.current_stream().wait_stream(self._stream)
+        return images
+
+    def _finish_job(self, job_folder: str, meta: Dict[str, Any], image: Any) -> Dict[str, Any]:
         os.makedirs(job_folder, exist_ok=True)
         out_path = os.path.join(job_folder, "output.png")
         image.save(out_path)
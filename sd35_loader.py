@@ -13,16 +13,39 @@ IMPORTANT:
 
 from __future__ import annotations
 
+import copy
+import ctypes
+import itertools
+import json
 import os
+import struct
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Any, Dict, Optional, Literal
 
-# Cached pipeline (so we don't reload every time)
-_sd35_pipeline = None
+# Cached pipelines, one per CUDA device ("cuda", "cuda:1", ...), so we don't
+# reload every time. Only the first one is read from disk; the others are
+# cloned from it (see _clone_pipeline_to_device).
+_sd35_pipelines: Dict[str, Any] = {}
 
-# Type alias for clarity
+# Type alias for clarity ("cuda:N" strings are accepted too)
 DeviceType = Literal["cuda", "cpu", "mps"]
 
+# Device types SD3.5 may run on, and whether the torch/CUDA check in
+# _ensure_gpu_only has already passed in this process.
+_ALLOWED_DEVICES = frozenset({"cuda"})
+_GPU_OK = False
+
+# Set SD35_TORCH_COMPILE=0 to skip torch.compile (e.g. for quick debug pods).
+_TORCH_COMPILE_ENABLED = os.environ.get("SD35_TORCH_COMPILE", "1") != "0"
+
+# Parsed model_paths.yaml and the mtime it was parsed at; re-read only when
+# the file changes.
+_CFG_CACHE: dict = {}
+_CFG_MTIME: float = 0.0
+
+# Set SD35_T5_INT8=0 to keep the T5-XXL text encoder in 16-bit.
+_T5_INT8_ENABLED = os.environ.get("SD35_T5_INT8", "1") != "0"
+
 
 def _project_root() -> Path:
     """
@@ -36,27 +59,40 @@ def _get_model_config() -> dict:
     """
     Load config/model_paths.yaml and return the sd35_large section.
     Lazy-imports yaml so the file can exist even before dependencies are installed.
+
+    The parsed file is cached until its mtime changes.
     """
     import importlib
 
+    global _CFG_CACHE, _CFG_MTIME
+
     root = _project_root()
     cfg_path = root / "config" / "model_paths.yaml"
 
-    if not cfg_path.exists():
+    try:
+        mtime = cfg_path.stat().st_mtime
+    except FileNotFoundError:
         raise FileNotFoundError(
             f"model_paths.yaml not found at: {cfg_path}\n"
             "Make sure you created it with the sd35_large entry."
-        )
+        ) from None
 
-    try:
-        yaml = importlib.import_module("yaml")
-    except ImportError as e:
-        raise RuntimeError(
-            "PyYAML is not installed. Install it with:\n\n"
-            "    pip install pyyaml\n"
-        ) from e
+    if _CFG_CACHE and mtime == _CFG_MTIME:
+        data = _CFG_CACHE
+    else:
+        try:
+            yaml = importlib.import_module("yaml")
+        except ImportError as e:
+            raise RuntimeError(
+                "PyYAML is not installed. Install it with:\n\n"
+                "    pip install pyyaml\n"
+            ) from e
+
+        # LibYAML's C loader when PyYAML was built with it.
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        data = yaml.load(cfg_path.read_text(encoding="utf-8"), Loader=loader) or {}
+        _CFG_CACHE, _CFG_MTIME = data, mtime
 
-    data = yaml.safe_load(cfg_path.read_text(encoding="utf-8")) or {}
     sd35_cfg = data.get("sd35_large")
     if not sd35_cfg:
         raise KeyError(
@@ -105,7 +141,19 @@ def _ensure_gpu_only(device: DeviceType) -> None:
     - If CUDA is not available -> raise
 
     This encodes your preference: no slow CPU tests, GPU only.
+    The torch/CUDA probe runs once per process.
     """
+    global _GPU_OK
+
+    if device.partition(":")[0] not in _ALLOWED_DEVICES:
+        raise RuntimeError(
+            f"SD3.5 is configured for GPU-only use. Received device='{device}'.\n"
+            "Refusing to run on CPU or non-CUDA devices."
+        )
+
+    if _GPU_OK:
+        return
+
     try:
         import torch
     except ImportError as e:
@@ -115,12 +163,6 @@ def _ensure_gpu_only(device: DeviceType) -> None:
             "(Adjust the CUDA version URL as needed for your GPU image.)"
         ) from e
 
-    if device != "cuda":
-        raise RuntimeError(
-            f"SD3.5 is configured for GPU-only use. Received device='{device}'.\n"
-            "Refusing to run on CPU or non-CUDA devices."
-        )
-
     if not torch.cuda.is_available():
         raise RuntimeError(
             "CUDA is not available in this environment.\n"
@@ -128,6 +170,165 @@ def _ensure_gpu_only(device: DeviceType) -> None:
             "Start a GPU pod (e.g., on RunPod) and try again."
         )
 
+    _GPU_OK = True
+
+
+# Pinned staging buffers for shard reads: two of them, so the disk read into
+# one overlaps the host->device copy out of the other.
+_STAGING_BYTES = 256 * 1024 * 1024
+
+_SAFETENSORS_DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+}
+
+
+class _ShardStager:
+    """
+    Reads safetensors shards into device memory through two pinned staging
+    buffers, allocated once per load and reused for every shard.
+
+    Tensor bytes are read (in file order, in chunks of _STAGING_BYTES) into
+    pinned buffer A while buffer B is being DMA'd to the GPU on a copy
+    stream, so disk reads and PCIe copies overlap and no pageable bounce
+    buffer is involved.
+    """
+
+    def __init__(self, device: DeviceType, torch) -> None:
+        self._torch = torch
+        self._device = device
+        self._copy_stream = torch.cuda.Stream(device=device)
+        self._staging = [
+            torch.empty(_STAGING_BYTES, dtype=torch.uint8, pin_memory=True) for _ in range(2)
+        ]
+        self._views = [
+            memoryview((ctypes.c_char * _STAGING_BYTES).from_address(buf.data_ptr())).cast("B")
+            for buf in self._staging
+        ]
+
+    def read(self, shard: Path) -> Dict[str, "torch.Tensor"]:
+        torch = self._torch
+        in_flight = [None, None]
+        tensors: Dict[str, "torch.Tensor"] = {}
+
+        with open(shard, "rb", buffering=0) as f:
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+            header.pop("__metadata__", None)
+            data_start = 8 + header_len
+
+            slot = 0
+            for name, info in sorted(header.items(), key=lambda kv: kv[1]["data_offsets"][0]):
+                begin, end = info["data_offsets"]
+                dtype = getattr(torch, _SAFETENSORS_DTYPES[info["dtype"]])
+                raw = torch.empty(end - begin, dtype=torch.uint8, device=self._device)
+
+                f.seek(data_start + begin)
+                for offset in range(0, end - begin, _STAGING_BYTES):
+                    size = min(_STAGING_BYTES, end - begin - offset)
+                    if in_flight[slot] is not None:
+                        in_flight[slot].synchronize()  # buffer still being copied
+                    view = self._views[slot][:size]
+                    filled = 0
+                    while filled < size:  # raw reads may return short
+                        n = f.readinto(view[filled:])
+                        if not n:
+                            raise RuntimeError(
+                                f"SD3.5 shard {shard} is truncated: tensor {name!r} "
+                                f"ends past the end of the file."
+                            )
+                        filled += n
+                    with torch.cuda.stream(self._copy_stream):
+                        raw[offset:offset + size].copy_(self._staging[slot][:size], non_blocking=True)
+                        event = torch.cuda.Event()
+                        event.record(self._copy_stream)
+                    in_flight[slot] = event
+                    slot ^= 1
+
+                raw.record_stream(self._copy_stream)
+                tensors[name] = raw.view(dtype).reshape(info["shape"])
+
+        self._copy_stream.synchronize()
+        return tensors
+
+
+def _stream_transformer_to_gpu(model_path: Path, torch_dtype, device: DeviceType):
+    """
+    Build the SD3 transformer on the meta device and fill it straight from
+    its safetensors shards loaded onto the GPU.
+
+    from_pretrained() materializes every weight in host RAM before the
+    .to(device) copy; here each shard goes disk -> pinned staging -> GPU
+    (_ShardStager) and the tensors are assigned into the empty
+    module, so the ~16 GB transformer never has a full host-side copy.
+
+    Returns None if accelerate is missing or the folder has no safetensors,
+    in which case from_pretrained() loads the transformer as usual.
+    """
+    try:
+        from accelerate import init_empty_weights
+        from accelerate.utils import set_module_tensor_to_device
+        from diffusers import SD3Transformer2DModel
+    except ImportError:
+        return None
+
+    transformer_dir = model_path / "transformer"
+    shards = sorted(transformer_dir.glob("*.safetensors"))
+    if not shards:
+        return None
+
+    config = SD3Transformer2DModel.load_config(transformer_dir)
+    with init_empty_weights():
+        transformer = SD3Transformer2DModel.from_config(config)
+
+    import torch
+
+    stager = _ShardStager(device, torch)
+    for shard in shards:
+        for name, tensor in stager.read(shard).items():
+            set_module_tensor_to_device(
+                transformer, name, device, value=tensor, dtype=torch_dtype
+            )
+
+    missing = [n for n, p in transformer.named_parameters() if p.device.type == "meta"]
+    if missing:
+        raise RuntimeError(
+            f"SD3.5 transformer shards are missing {len(missing)} tensors "
+            f"(e.g. {missing[0]})."
+        )
+
+    return transformer.eval()
+
+
+def _load_t5_int8(model_path: Path, device: DeviceType):
+    """
+    Load T5-XXL (text_encoder_3) with bitsandbytes 8-bit weights on `device`.
+
+    T5 is ~9 GB of the ~11 GB of SD3.5 text encoders and only runs once per
+    prompt; in int8 it is half the bytes to read and keep in VRAM.
+    Returns None if bitsandbytes is not installed.
+    """
+    try:
+        import bitsandbytes  # noqa: F401
+        from transformers import BitsAndBytesConfig, T5EncoderModel
+    except ImportError:
+        return None
+
+    return T5EncoderModel.from_pretrained(
+        model_path,
+        subfolder="text_encoder_3",
+        quantization_config=BitsAndBytesConfig(load_in_8bit=True),
+        device_map={"": device},
+    )
+
 
 def load_sd35_pipeline(
     device: DeviceType = "cuda",
@@ -144,13 +345,17 @@ def load_sd35_pipeline(
     NOTE:
         This function should only be called in your GPU runtime (RunPod, etc.).
     """
-    global _sd35_pipeline
-    if _sd35_pipeline is not None:
-        return _sd35_pipeline
+    pipe = _sd35_pipelines.get(device)
+    if pipe is not None:
+        return pipe
 
     # Enforce GPU-only policy
     _ensure_gpu_only(device=device)
 
+    # Let safetensors copy shards to the GPU directly (must be set before
+    # safetensors is imported).
+    os.environ.setdefault("SAFETENSORS_FAST_GPU", "1")
+
     # Lazy imports for heavy libs
     try:
         import torch
@@ -174,32 +379,132 @@ def load_sd35_pipeline(
     else:
         raise ValueError(f"Unsupported dtype: {dtype}")
 
+    from runtime.block_streaming import place_pipeline_for_streaming, should_stream_blocks
+
+    stream_blocks = should_stream_blocks(device, torch)
+
+    # Another GPU already holds a resident copy: clone it over instead of
+    # going back to the disk.
+    if not stream_blocks:
+        for src_device, src_pipe in _sd35_pipelines.items():
+            if _is_resident(src_pipe, src_device, torch):
+                pipe = _clone_pipeline_to_device(src_pipe, model_path, device, torch)
+                if _TORCH_COMPILE_ENABLED and dtype == "bfloat16":
+                    _compile_pipeline(pipe, torch)
+                _sd35_pipelines[device] = pipe
+                return pipe
+
+    # Small-VRAM GPUs keep the transformer blocks in host memory and stream
+    # them per block; otherwise the transformer is streamed disk -> GPU once.
+    # The remaining components load through from_pretrained as before.
+    extra_components = {}
+    if not stream_blocks:
+        transformer = _stream_transformer_to_gpu(model_path, torch_dtype, device)
+        if transformer is not None:
+            extra_components["transformer"] = transformer
+
+    if _T5_INT8_ENABLED:
+        text_encoder_3 = _load_t5_int8(model_path, device)
+        if text_encoder_3 is not None:
+            extra_components["text_encoder_3"] = text_encoder_3
+
     # We already have local weights; no need for use_auth_token here.
     pipe = StableDiffusion3Pipeline.from_pretrained(
         model_path,
         torch_dtype=torch_dtype,
         use_auth_token=False,
+        **extra_components,
     )
 
-    pipe = pipe.to(device)
+    # Decode 1024x1024 latents in overlapping tiles: the full-frame VAE
+    # decode is the peak-memory point of a run on 12-16 GB cards.
+    pipe.vae.enable_tiling()
 
-    # Optional memory optimizations (only if available)
-    if hasattr(pipe, "enable_model_cpu_offload"):
-        # We usually won't use this in production RunPod config, but it's safe.
-        pipe.enable_model_cpu_offload()
-    elif hasattr(pipe, "enable_sequential_cpu_offload"):
-        pipe.enable_sequential_cpu_offload()
+    if stream_blocks:
+        # Text encoders and VAE stay resident; MM-DiT blocks are copied in on
+        # a side stream while the previous block computes, instead of
+        # accelerate's offload hooks copying on the compute stream.
+        place_pipeline_for_streaming(pipe, device, torch)
+    else:
+        pipe = pipe.to(device)
+
+        # Fuse the per-step elementwise ops and cut eager dispatch overhead.
+        # bf16 only (stable fused attention on Ampere+); the streamed-block
+        # path swaps weights under the graph, so it stays eager. The first
+        # call pays the compile, later ones reuse the graphs.
+        if _TORCH_COMPILE_ENABLED and dtype == "bfloat16":
+            _compile_pipeline(pipe, torch)
+
+    _sd35_pipelines[device] = pipe
+    return pipe
 
-    _sd35_pipeline = pipe
-    return _sd35_pipeline
+
+def _compile_pipeline(pipe, torch) -> None:
+    pipe.transformer = torch.compile(
+        pipe.transformer, mode="reduce-overhead", fullgraph=False, dynamic=False
+    )
+    pipe.vae.decode = torch.compile(pipe.vae.decode)
+
+
+def _is_resident(pipe, device: str, torch) -> bool:
+    """
+    True when the whole transformer of `pipe` lives on `device` (i.e. it was
+    not set up for per-block streaming from host memory).
+    """
+    transformer = getattr(pipe.transformer, "_orig_mod", pipe.transformer)
+    target = torch.device(device)
+    if target.index is None:
+        target = torch.device("cuda", torch.cuda.current_device())
+    return all(p.device == target for p in transformer.parameters())
+
+
+def _clone_pipeline_to_device(src_pipe, model_path: Path, device: str, torch):
+    """
+    Copy a resident pipeline onto another GPU without touching the disk.
+
+    Every parameter and buffer is pre-seeded in the deepcopy memo with its
+    copy already on `device`, so weights go GPU -> GPU (peer-to-peer where
+    the topology allows) and the source GPU never holds a second copy.
+    torch.compile wrappers are unwrapped first; the caller re-compiles.
+    bitsandbytes int8 modules cannot be moved, so those are loaded again.
+    """
+    components = {}
+    reload_int8 = []
+    for name, component in src_pipe.components.items():
+        if getattr(component, "is_loaded_in_8bit", False):
+            reload_int8.append(name)
+            continue
+        components[name] = getattr(component, "_orig_mod", component)
+
+    memo: Dict[int, Any] = {}
+    target = torch.device(device)
+    for component in components.values():
+        if not isinstance(component, torch.nn.Module):
+            continue
+        for tensor in itertools.chain(component.parameters(), component.buffers()):
+            if id(tensor) in memo:
+                continue  # tied weights
+            copied = tensor.detach().to(target)
+            if isinstance(tensor, torch.nn.Parameter):
+                copied = torch.nn.Parameter(copied, requires_grad=tensor.requires_grad)
+            memo[id(tensor)] = copied
+
+    cloned = copy.deepcopy(components, memo)
+    # The compiled vae.decode is an instance attribute bound to the source VAE.
+    vars(cloned["vae"]).pop("decode", None)
+
+    for name in reload_int8:
+        cloned[name] = _load_t5_int8(model_path, device)
+
+    torch.cuda.synchronize(target)
+    return type(src_pipe)(**cloned)
 
 
 def unload_sd35_pipeline() -> None:
     """
     Optional helper to free VRAM if you ever need to unload SD3.5.
     """
-    global _sd35_pipeline
-    if _sd35_pipeline is None:
+    if not _sd35_pipelines:
         return
 
     try:
@@ -207,7 +512,7 @@ def unload_sd35_pipeline() -> None:
     except ImportError:
         torch = None
 
-    _sd35_pipeline = None
+    _sd35_pipelines.clear()
 
     if torch is not None and torch.cuda.is_available():
         torch.cuda.empty_cache()
@@ -0,0 +1,134 @@
+"""
+training_scripts/_skeleton.py
+
+Shared body of the training skeleton scripts (train_full_finetune.py,
+train_lora.py, train_refiner.py). Each of those is a thin shim around
+run(kind); only the banner and --config default differ per kind.
+"""
+
+import argparse
+import sys
+from typing import Dict, Tuple
+
+# kind -> (parser description, default --config, --config help)
+_PARSER_ARGS: Dict[str, Tuple[str, str, str]] = {
+    "full": (
+        "RENDEREXPO ULTRA full SD3.5 finetune (skeleton).",
+        "config/training/base_sd35.yaml",
+        "Path to the full finetune training config file.",
+    ),
+    "lora": (
+        "RENDEREXPO LoRA training (skeleton).",
+        "config/training/lora_interiors.yaml",
+        "Path to the LoRA training config file.",
+    ),
+    "refiner": (
+        "RENDEREXPO Refiner training (skeleton).",
+        "config/training/refiner_detail.yaml",
+        "Path to the refiner training config file.",
+    ),
+}
+
+# kind -> banner printed with a single write; {config_path} is filled in.
+BANNERS: Dict[str, str] = {
+    "full": "\n".join(
+        [
+            "==============================================",
+            " RENDEREXPO AI STUDIO - Full Finetune Trainer",
+            " SKELETON ONLY - NO TRAINING RUNS HERE",
+            "==============================================",
+            "- Expected config: {config_path}",
+            "",
+            "Planned future behavior:",
+            " 1) Load base SD3.5 model from models/sd35-large.",
+            " 2) Mix datasets: interiors, exteriors, aerials, etc.",
+            " 3) Apply training schedule (LR, steps, warmup).",
+            " 4) Save finetuned model as RENDEREXPO ULTRA.",
+            " 5) Update config/model_paths.yaml to point to new model.",
+            "",
+            "For now, this just ensures the training structure exists.",
+        ]
+    ) + "\n",
+    "lora": "\n".join(
+        [
+            "========================================",
+            " RENDEREXPO AI STUDIO - LoRA Trainer",
+            " SKELETON ONLY - NO TRAINING RUNS HERE",
+            "========================================",
+            "- Expected config: {config_path}",
+            "",
+            "Next phases (future):",
+            " 1) Load YAML config (learning rate, steps, dataset paths).",
+            " 2) Initialize SD3.5 base model with diffusers / torch.",
+            " 3) Attach LoRA adapters to the model.",
+            " 4) Build training dataloader from your private datasets.",
+            " 5) Run training loop on GPU (RunPod).",
+            "",
+            "For now, this script only documents the flow and keeps structure ready.",
+        ]
+    ) + "\n",
+    "refiner": "\n".join(
+        [
+            "========================================",
+            " RENDEREXPO AI STUDIO - Refiner Trainer",
+            " SKELETON ONLY - NO TRAINING RUNS HERE",
+            "========================================",
+            "- Expected config: {config_path}",
+            "",
+            "Future workflow (conceptual):",
+            " 1) Load SD3.5 or RENDEREXPO ULTRA base model.",
+            " 2) Load refiner config for target stage (detail/lighting/geometry/highres).",
+            " 3) Sample low-denoise training examples.",
+            " 4) Run training on GPU with appropriate losses.",
+            " 5) Save refiner weights under training_runs/refiners/...",
+            "",
+            "Right now, this script is just a placeholder for structure.",
+        ]
+    ) + "\n",
+}
+
+_PARSERS: Dict[str, argparse.ArgumentParser] = {}
+
+
+def _parser(kind: str) -> argparse.ArgumentParser:
+    parser = _PARSERS.get(kind)
+    if parser is None:
+        description, default_config, config_help = _PARSER_ARGS[kind]
+        parser = argparse.ArgumentParser(description=description)
+        parser.add_argument(
+            "--config",
+            type=str,
+            default=default_config,
+            help=config_help,
+        )
+        _PARSERS[kind] = parser
+    return parser
+
+
+def run(kind: str) -> int:
+    """
+    Parse --config and print the skeleton banner for `kind`
+    ("full", "lora" or "refiner"). No training runs here.
+
+    Returns the process exit code: 0 for the skeleton run; real training
+    will return non-zero on failure.
+    """
+    args = _parser(kind).parse_args()
+
+    # The config is only named here; open it (and build a Path, if needed)
+    # once real training reads it.
+    sys.stdout.write(BANNERS[kind].format_map({"config_path": args.config}))
+    sys.stdout.flush()
+    return 0
+
+
+def full_main() -> int:
+    return run("full")
+
+
+def lora_main() -> int:
+    return run("lora")
+
+
+def refiner_main() -> int:
+    return run("refiner")
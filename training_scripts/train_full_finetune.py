@@ -14,40 +14,11 @@ Later, on GPU:
 - Train RENDEREXPO ULTRA as your canonical model.
 """
 
-import argparse
-from pathlib import Path
-
-
-def main():
-    parser = argparse.ArgumentParser(
-        description="RENDEREXPO ULTRA full SD3.5 finetune (skeleton)."
-    )
-    parser.add_argument(
-        "--config",
-        type=str,
-        default="config/training/base_sd35.yaml",
-        help="Path to the full finetune training config file.",
-    )
-    args = parser.parse_args()
-
-    config_path = Path(args.config)
-
-    print("==============================================")
-    print(" RENDEREXPO AI STUDIO - Full Finetune Trainer")
-    print(" SKELETON ONLY - NO TRAINING RUNS HERE")
-    print("==============================================")
-    print(f"- Expected config: {config_path}")
-    print()
-    print("Planned future behavior:")
-    print(" 1) Load base SD3.5 model from models/sd35-large.")
-    print(" 2) Mix datasets: interiors, exteriors, aerials, etc.")
-    print(" 3) Apply training schedule (LR, steps, warmup).")
-    print(" 4) Save finetuned model as RENDEREXPO ULTRA.")
-    print(" 5) Update config/model_paths.yaml to point to new model.")
-
-    print()
-    print("For now, this just ensures the training structure exists.")
+try:
+    from ._skeleton import full_main as main
+except ImportError:  # run as a script: training_scripts/ is on sys.path
+    from _skeleton import full_main as main
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
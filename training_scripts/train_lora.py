@@ -15,37 +15,11 @@ Later, on a GPU machine (RunPod), this script will:
 - Run the actual training loop
 """
 
-import argparse
-from pathlib import Path
-
-
-def main():
-    parser = argparse.ArgumentParser(description="RENDEREXPO LoRA training (skeleton).")
-    parser.add_argument(
-        "--config",
-        type=str,
-        default="config/training/lora_interiors.yaml",
-        help="Path to the LoRA training config file.",
-    )
-    args = parser.parse_args()
-
-    config_path = Path(args.config)
-
-    print("========================================")
-    print(" RENDEREXPO AI STUDIO - LoRA Trainer")
-    print(" SKELETON ONLY - NO TRAINING RUNS HERE")
-    print("========================================")
-    print(f"- Expected config: {config_path}")
-    print()
-    print("Next phases (future):")
-    print(" 1) Load YAML config (learning rate, steps, dataset paths).")
-    print(" 2) Initialize SD3.5 base model with diffusers / torch.")
-    print(" 3) Attach LoRA adapters to the model.")
-    print(" 4) Build training dataloader from your private datasets.")
-    print(" 5) Run training loop on GPU (RunPod).")
-    print()
-    print("For now, this script only documents the flow and keeps structure ready.")
+try:
+    from ._skeleton import lora_main as main
+except ImportError:  # run as a script: training_scripts/ is on sys.path
+    from _skeleton import lora_main as main
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
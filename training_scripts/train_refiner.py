@@ -8,38 +8,11 @@ IMPORTANT:
 - Used to document how refiner training will be wired later.
 """
 
-import argparse
-from pathlib import Path
-
-
-def main():
-    parser = argparse.ArgumentParser(description="RENDEREXPO Refiner training (skeleton).")
-    parser.add_argument(
-        "--config",
-        type=str,
-        default="config/training/refiner_detail.yaml",
-        help="Path to the refiner training config file.",
-    )
-    args = parser.parse_args()
-
-    config_path = Path(args.config)
-
-    print("========================================")
-    print(" RENDEREXPO AI STUDIO - Refiner Trainer")
-    print(" SKELETON ONLY - NO TRAINING RUNS HERE")
-    print("========================================")
-    print(f"- Expected config: {config_path}")
-    print()
-    print("Future workflow (conceptual):")
-    print(" 1) Load SD3.5 or RENDEREXPO ULTRA base model.")
-    print(" 2) Load refiner config for target stage (detail/lighting/geometry/highres).")
-    print(" 3) Sample low-denoise training examples.")
-    print(" 4) Run training on GPU with appropriate losses.")
-    print(" 5) Save refiner weights under training_runs/refiners/...")
-
-    print()
-    print("Right now, this script is just a placeholder for structure.")
+try:
+    from ._skeleton import refiner_main as main
+except ImportError:  # run as a script: training_scripts/ is on sys.path
+    from _skeleton import refiner_main as main
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())